@@ -8,12 +8,12 @@ import time
 import random
 import requests
 import json
-import ollama
 from bs4 import BeautifulSoup
 from duckduckgo_search import DDGS
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from core.brain import Brain
+from core.brain_service import connect_brain
+from core.llm_gateway import ask, BACKGROUND
 
 TOPIC_FILE = os.path.join(os.path.dirname(__file__), "topic_to_learn")
 
@@ -87,14 +87,13 @@ def verify_and_synthesize(topic, sources_text):
     """
     
     try:
-        response = ollama.chat(model='mixtral', messages=[{'role': 'user', 'content': prompt}])
-        return response['message']['content']
+        return ask("synthesis", [{'role': 'user', 'content': prompt}], priority=BACKGROUND)
     except Exception as e:
         print(f"   ❌ LLM Error: {e}")
         return None
 
 def run_learning_loop():
-    brain = Brain()
+    brain = connect_brain()
     print(f"📚 Verified Auto-Learner Started.")
     
     while True:
@@ -0,0 +1,266 @@
+"""
+JARVIS Brain Benchmark
+Measures the Brain on synthetic corpora with a deterministic fake embedder
+(no Ollama needed): ingest throughput, recall p50/p99 latency, hit rate and
+off-topic noise, maintenance and index build time and disk footprint. Every
+run is saved as JSON, so a change can be compared against the run before it.
+
+Run with: python brain_benchmark.py [10k 100k 1M]
+Compare:  python brain_benchmark.py --compare <old.json> <new.json>
+"""
+import sys
+import os
+import json
+import time
+import random
+import hashlib
+import shutil
+import tempfile
+import subprocess
+import contextlib
+import numpy as np
+from pathlib import Path
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import config
+import core.brain as brain_module
+import core.retention as retention
+
+RESULTS_DIR = brain_module.BRAIN_DIR / "benchmarks"
+DEFAULT_SIZES = ["10k", "100k"]
+DIM = 768          # Same as nomic-embed-text
+QUERIES = 200
+TOP_K = 3
+SEED = 42
+
+# Synthetic language: topics own a slice of the vocabulary, so chunks about
+# the same topic share words (and therefore have similar fake embeddings)
+VOCAB = [f"w{i}" for i in range(20_000)]
+TOPICS = [f"Topic{i}" for i in range(200)]
+OFF_TOPIC_VOCAB = [f"z{i}" for i in range(1_000)]
+SOURCES = ["search", "web", "orchestra:{}", "verified:{}", "user"]
+WORDS_PER_CHUNK = 40
+
+
+class FakeEmbedder:
+    """Deterministic hashed bag-of-words vectors: same text, same vector, on any machine"""
+    def __init__(self, dim=DIM):
+        self.dim = dim
+
+    def check(self, model):
+        return f"Fake Embeddings Ready ({self.dim}d, deterministic)."
+
+    def _index(self, word):
+        h = hashlib.blake2b(word.encode(), digest_size=8).digest()
+        n = int.from_bytes(h, "little")
+        return n % self.dim, 1.0 if (n >> 63) else -1.0
+
+    def embed(self, model, texts):
+        mat = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                col, sign = self._index(word.strip(".,"))
+                mat[row, col] += sign
+        mat /= np.linalg.norm(mat, axis=1, keepdims=True) + 1e-12
+        return mat.tolist()
+
+
+def _parse_size(s):
+    s = s.lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(s[-1], 1)
+    return int(float(s.rstrip("km")) * mult)
+
+def _chunk(rng, i):
+    """One synthetic chunk: mostly topic words plus some common words"""
+    topic = rng.randrange(len(TOPICS))
+    lo = topic * (len(VOCAB) // len(TOPICS))
+    topic_words = VOCAB[lo:lo + len(VOCAB) // len(TOPICS)]
+    words = rng.choices(topic_words, k=WORDS_PER_CHUNK * 3 // 4) + rng.choices(VOCAB[:500], k=WORDS_PER_CHUNK // 4)
+    rng.shuffle(words)
+    source = rng.choice(SOURCES).format(TOPICS[topic])
+    # The id makes every chunk unique, so dedup never drops one
+    return f"chunk {i} " + " ".join(words) + ".", source
+
+def corpus(n, seed=SEED):
+    """Stream n (text, source) documents; the same seed gives the same corpus"""
+    rng = random.Random(seed)
+    for i in range(n):
+        yield _chunk(rng, i)
+
+def _queries(n_rows, seed=SEED):
+    """Queries are word subsets of known chunks: the source chunk should be recalled"""
+    rng = random.Random(seed + 1)
+    targets = sorted(rng.sample(range(n_rows), min(QUERIES, n_rows)))
+    queries = []
+    for i, (text, _) in enumerate(corpus(n_rows)):
+        if targets and i == targets[0]:
+            targets.pop(0)
+            words = text.rstrip(".").split()[2:]
+            queries.append((" ".join(rng.sample(words, len(words) // 2)), text))
+            if not targets:
+                break
+    return queries
+
+def _off_topic_queries(n=50, seed=SEED):
+    """Words no chunk contains, plus "chunk" (which every chunk does): should recall nothing"""
+    rng = random.Random(seed + 2)
+    return [" ".join(rng.sample(OFF_TOPIC_VOCAB, 6) + ["chunk"]) for _ in range(n)]
+
+def _dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+def _latency_stats(samples):
+    ms = np.asarray(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "mean_ms": round(float(ms.mean()), 2),
+    }
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+def _settings():
+    """The config values that change Brain performance"""
+    names = [
+        "EMBED_BATCH_SIZE", "EMBED_MAX_INFLIGHT", "CHUNKER", "CHUNK_MAX_TOKENS", "DEDUP_SIMILARITY",
+        "VECTOR_INDEX_MIN_ROWS", "VECTOR_INDEX_NPROBES", "VECTOR_INDEX_REFINE",
+        "WRITE_BATCH_ROWS", "WRITE_FLUSH_SECONDS", "RECALL_HYBRID_CANDIDATES", "RECALL_KEYWORD_DISTANCE_FACTOR",
+        "RECALL_MMR_LAMBDA", "RECALL_MMR_CANDIDATES", "TOPIC_ROUTING", "TOPIC_ROUTE_TOP_N",
+        "TOPIC_ROUTE_MIN_SIMILARITY", "VECTOR_DTYPE", "VECTOR_DIM",
+    ]
+    return {n: getattr(config, n, None) for n in names}
+
+
+def _isolate(workdir):
+    """Point the Brain module at a scratch directory and the fake embedder"""
+    workdir = Path(workdir)
+    brain_module.DB_PATH = workdir / "lancedb"
+    brain_module.EMBED_CACHE_PATH = workdir / "embed_cache.sqlite"
+    brain_module.MAINTENANCE_STATE = workdir / "maintenance.json"
+    brain_module.ACTIVE_TABLE_FILE = workdir / "active_table.json"
+    brain_module.USAGE_PATH = workdir / "usage.sqlite"
+    brain_module.TOPIC_CENTROIDS = workdir / "topic_centroids.npz"
+    # Maintenance is timed explicitly, and retention must not shrink the corpus
+    brain_module.BRAIN_MAINTENANCE_INTERVAL = 0
+    retention.MAX_ROWS = None
+    brain_module.EMBEDDERS["fake"] = FakeEmbedder
+    brain_module.save_active_table("knowledge", f"fake-bow-{DIM}", "fake")
+
+
+def bench_size(n):
+    workdir = tempfile.mkdtemp(prefix="jarvis_bench_")
+    try:
+        _isolate(workdir)
+        brain = brain_module.Brain()
+        result = {"rows": n}
+
+        # 1. Ingest
+        print(f"\n📥 Ingesting {n} chunks...")
+        start = time.perf_counter()
+        # Per-document log lines would dominate the timing
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            brain.learn_many(corpus(n))
+            brain.flush()
+        elapsed = time.perf_counter() - start
+        result["ingest_seconds"] = round(elapsed, 2)
+        result["ingest_chunks_per_sec"] = round(n / elapsed, 1)
+        result["stored_rows"] = brain.table.count_rows()
+
+        # 2. The background maintenance pass (retention, centroids, index build,
+        # compaction); the IVF-PQ build inside it is timed on its own
+        print("🛠️ Maintenance pass (index build + compaction)...")
+        build_seconds = []
+        build_index = brain._build_vector_index
+        def timed_build(rows):
+            t = time.perf_counter()
+            build_index(rows)
+            build_seconds.append(time.perf_counter() - t)
+        brain._build_vector_index = timed_build
+        start = time.perf_counter()
+        brain.maintain()
+        result["maintenance_seconds"] = round(time.perf_counter() - start, 2)
+        result["vector_index"] = brain._has_vector_index()
+        if build_seconds:
+            # Below VECTOR_INDEX_MIN_ROWS no index is built (recall is a flat scan)
+            result["index_build_seconds"] = round(sum(build_seconds), 2)
+        result["disk_mb"] = round(_dir_bytes(brain_module.DB_PATH) / 1e6, 2)
+
+        # 3. Recall (unique queries, so every call misses the recall cache)
+        queries = _queries(n)
+        brain._embed_many([q for q, _ in queries])  # Embedding cost is not what we measure
+        for mode in ("vector", "hybrid"):
+            print(f"🔎 {len(queries)} {mode} recalls...")
+            latencies, hits = [], 0
+            for q, expected in queries:
+                brain.recall_cache.clear()
+                start = time.perf_counter()
+                found = brain.recall(q, top_k=TOP_K, threshold=2.0, mode=mode)
+                latencies.append(time.perf_counter() - start)
+                hits += any(r["text"] == expected for r in found)
+            # Precision at the default threshold: share of off-topic queries that recall anything
+            off_topic = _off_topic_queries()
+            noisy = sum(bool(brain.recall(q, top_k=TOP_K, mode=mode)) for q in off_topic)
+            result[f"recall_{mode}"] = {**_latency_stats(latencies), f"hit@{TOP_K}": round(hits / len(queries), 3),
+                                        "off_topic_hits": round(noisy / len(off_topic), 3)}
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(old_path, new_path):
+    """Print every metric side by side with the change in percent"""
+    with open(old_path) as f:
+        old = {r["rows"]: r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = {r["rows"]: r for r in json.load(f)["results"]}
+
+    def flat(r, prefix=""):
+        out = {}
+        for k, v in r.items():
+            if isinstance(v, dict):
+                out.update(flat(v, f"{prefix}{k}."))
+            elif isinstance(v, (int, float)) and not isinstance(v, bool):
+                out[prefix + k] = v
+        return out
+
+    for rows in sorted(set(old) & set(new)):
+        print(f"\n📊 {rows} rows")
+        a, b = flat(old[rows]), flat(new[rows])
+        for k in a:
+            if k in b and k != "rows":
+                change = f"{(b[k] - a[k]) / a[k] * 100:+.1f}%" if a[k] else "n/a"
+                print(f"   {k:<32}{a[k]:>12}{b[k]:>12}{change:>10}")
+
+
+def main(sizes):
+    report = {
+        "started_at": datetime.now().isoformat(),
+        "git_commit": _git_commit(),
+        "dim": DIM,
+        "queries": QUERIES,
+        "settings": _settings(),
+        "results": [],
+    }
+    for size in sizes:
+        result = bench_size(_parse_size(size))
+        report["results"].append(result)
+        print(json.dumps(result, indent=2))
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULTS_DIR / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Saved to {path}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--compare":
+        compare(sys.argv[2], sys.argv[3])
+    else:
+        main(sys.argv[1:] or DEFAULT_SIZES)
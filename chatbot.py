@@ -4,21 +4,37 @@ Direct access to the Brain and Orchestra.
 """
 import sys
 import os
-from config import PROMPT_FRIEND, PROMPT_AI
-import re
+from config import PROMPT_FRIEND, PROMPT_AI, RECALL_MODE
 import time
 import queue
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from core.llm_stream import StreamingLLM
-from core.brain import Brain
+from core.brain_service import connect_brain
 from core.actions import ActionEngine
+from core.action_tags import split_actions
 
 from core.coordination import set_orchestra_status
 
+# Action tags the text chatbot runs (no app control or vision here)
+CHAT_COMMANDS = ("DOC", "SEARCH", "LEARN")
+
+def run_action(cmd, param, actions):
+    """[DOC], [SEARCH] and [LEARN] (runs on the action thread while the reply streams)"""
+    if cmd == "SEARCH":
+        res = actions.web_search(param)
+        return f"(Result: {len(res)} chars found)"
+    if cmd == "DOC":
+        return actions.execute(f"DOC:{param}")
+    if cmd == "LEARN":
+        # Instant learn
+        # Real orchestration handles this in background
+        return actions.execute(f"SEARCH:{param}")
+
 def main():
     print("\n" + "="*50)
     print("  🎻 JARVIS Knowledge Orchestra - Conductor")
@@ -26,11 +42,13 @@ def main():
     print("="*50 + "\n")
     
     llm = StreamingLLM()
-    brain = Brain()
+    brain = connect_brain()
     actions = ActionEngine()
+    action_runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="action")
     
     # Simple history
     history = []
+    recall_mode = RECALL_MODE
     
     print("Type 'exit' to quit. Type 'test idea: [idea]' to run simulation.")
     
@@ -60,6 +78,17 @@ def main():
                     print("Usage: /friendmode [on|off]")
                 continue
 
+            if user_text.lower().startswith("/recall"):
+                cmd_parts = user_text.lower().split()
+                mode = cmd_parts[1] if len(cmd_parts) > 1 else ""
+                
+                if mode in ["hybrid", "vector"]:
+                    recall_mode = mode
+                    print(f"\n🔎 Recall mode: {recall_mode.upper()}")
+                else:
+                    print(f"Usage: /recall [hybrid|vector]  (current: {recall_mode})")
+                continue
+
             if user_text.lower().startswith("predict"):
                 query = user_text[7:].strip()
                 print(f"\n🔮 Oracle Activated: {query}")
@@ -83,16 +112,15 @@ def main():
                 user_text = f"Research the feasibility of this idea: {idea}"
             
             # 1. RECALL (The Brain)
-            recalled_items = brain.recall(user_text, top_k=5)
+            recalled_items = brain.recall(user_text, top_k=5, mode=recall_mode)
             context_prefix = ""
             
             if recalled_items:
                 print(f"   💡 Brain Activated: Found {len(recalled_items)} relevant citations.")
                 
-                # Check for Expert Persona
-                topics = [r['source'].replace('verified:', '').replace('web:', '') for r in recalled_items if 'verified:' in r['source']]
-                if topics:
-                    dominant_topic = max(set(topics), key=topics.count)
+                # Check for Expert Persona (nearest verified topic centroid only)
+                dominant_topic = brain.topic_for(user_text, source_kind="verified")
+                if dominant_topic:
                     print(f"   🎓 Expert Mode: {dominant_topic}")
                     context_prefix += f"[SYSTEM: You are an expert in {dominant_topic}.]\n"
                 
@@ -106,9 +134,13 @@ def main():
             # 2. GENERATE (The Mind)
             print("\nJARVIS > ", end="", flush=True)
             
-            full_response = ""
-            full_response = ""
-            for chunk in llm.chat_stream(full_input):
+            # Tags are cut from the text and start running as soon as they are complete
+            dispatched = []
+            def dispatch(cmd, param):
+                print(f"\n   ⚡ Executing {cmd}...")
+                dispatched.append(action_runner.submit(run_action, cmd, param, actions))
+            # Only the tags this front-end runs are cut out; the rest stay visible
+            for chunk in split_actions(llm.chat_stream(full_input), dispatch, commands=CHAT_COMMANDS):
                 # Clean up weird spacing
                 clean_chunk = chunk.replace('\r', '').replace('\t', ' ')
                 
@@ -120,24 +152,16 @@ def main():
                     if i < len(words) - 1:
                         print(" ", end="", flush=True)
                     time.sleep(0.02) # Fast typing speed
-                    
-                full_response += chunk
             print("\n")
             
-            # 3. ACTION (The Hands)
-            # Execute [DOC], [SEARCH], etc.
-            commands = re.findall(r"\[(DOC|SEARCH|LEARN):\s*(.*?)\]", full_response, re.IGNORECASE | re.DOTALL)
-            for cmd, param in commands:
-                print(f"   ⚡ Executing {cmd}...")
-                if cmd.upper() == "SEARCH":
-                    res = actions.web_search(param)
-                    print(f"      (Result: {len(res)} chars found)")
-                elif cmd.upper() == "DOC":
-                    actions.execute(f"DOC:{param}")
-                elif cmd.upper() == "LEARN":
-                    # Instant learn
-                    actions.execute(f"SEARCH:{param}") 
-                    # Real orchestration handles this in background
+            # 3. ACTION (The Hands): already running, wait for the results
+            for future in dispatched:
+                try:
+                    result = future.result()
+                    if result:
+                        print(f"      {result}")
+                except Exception as e:
+                    print(f"      ❌ Action failed: {e}")
             
         except KeyboardInterrupt:
             break
@@ -1,17 +1,24 @@
 import lancedb
+import json
 from pathlib import Path
 
 BRAIN_DIR = Path(__file__).parent / "brain_data"
 DB_PATH = BRAIN_DIR / "lancedb"
+ACTIVE_TABLE_FILE = BRAIN_DIR / "active_table.json"
 
 try:
+    # The active table changes after a re-embed migration (core/reembed.py)
+    table_name = "knowledge"
+    if ACTIVE_TABLE_FILE.exists():
+        table_name = json.loads(ACTIVE_TABLE_FILE.read_text())["table"]
+        
     db = lancedb.connect(str(DB_PATH))
-    if "knowledge" in db.table_names():
-        tbl = db.open_table("knowledge")
-        print(f"✅ Data Found! Total Concepts: {len(tbl)}")
+    if table_name in db.table_names():
+        tbl = db.open_table(table_name)
+        print(f"✅ Data Found in '{table_name}'! Total Concepts: {len(tbl)}")
         print("Sample Data:")
         print(tbl.search().limit(3).to_list())
     else:
-        print("⚠️ No 'knowledge' table found yet.")
+        print(f"⚠️ No '{table_name}' table found yet.")
 except Exception as e:
     print(f"❌ Error checking brain: {e}")
@@ -19,6 +19,92 @@ VOICE_SAMPLE_PATH = VOICE_SAMPLE_DIR / "your_voice.wav"
 # Ollama settings
 OLLAMA_URL = "http://localhost:11434"
 OLLAMA_MODEL = "mixtral"
+LLM_CONNECT_TIMEOUT = 3.05    # Seconds to open a connection to Ollama
+LLM_READ_TIMEOUT = 60         # Seconds to wait for the next streamed chunk (model loading included)
+LLM_POOL_SIZE = 4             # Kept-alive connections to Ollama
+LLM_HEALTH_COOLDOWN = 2.0     # After a failure, fail fast this long before probing Ollama again...
+LLM_HEALTH_MAX_COOLDOWN = 30.0  # ...doubling per failed probe up to this
+# Task routing: the model for each kind of LLM call and the generation time it should stay under
+# (seconds, queue wait excluded). python llm_task_report.py shows how each task actually performs.
+LLM_SMALL_MODEL = "llama3.2:3b"   # Fast tier for classification and short answers (ollama pull llama3.2:3b)
+LLM_TASKS = {
+    # Large model: long-form answers
+    "chat":             {"model": OLLAMA_MODEL, "budget": 30},
+    "synthesis":        {"model": OLLAMA_MODEL, "budget": 120},
+    # Small model: short or structured output
+    "relevance":        {"model": LLM_SMALL_MODEL, "budget": 2, "options": {"num_predict": 4, "temperature": 0}},
+    "topic_proposal":   {"model": LLM_SMALL_MODEL, "budget": 3, "options": {"num_predict": 24}},
+    "query_generation": {"model": LLM_SMALL_MODEL, "budget": 5, "options": {"num_predict": 96}},
+    "prediction":       {"model": LLM_SMALL_MODEL, "budget": 10, "options": {"temperature": 0.2}},
+    "summary":          {"model": LLM_SMALL_MODEL, "budget": 15},
+    "vision":           {"model": "llava", "budget": 60},
+}
+HISTORY_TOKEN_BUDGET = 3000   # Prompt tokens for system prompt + history + current message
+HISTORY_MAX_MESSAGES = 40     # Messages kept in memory; older ones live on in the rolling summary
+HISTORY_SUMMARY_TOKENS = 300  # Max size of the rolling summary of evicted turns
+
+# Brain (RAG) settings
+EMBED_BACKEND = "ollama"  # "ollama" (HTTP) or "local" (sentence-transformers, in-process on the CPU)
+EMBED_MODEL = "nomic-embed-text"  # Local backend: a sentence-transformers model, e.g. "all-MiniLM-L6-v2"
+EMBED_LOCAL_THREADS = None  # Local backend: CPU threads (None = all cores)
+EMBED_BATCH_SIZE = 32     # Chunks per embed request
+EMBED_MAX_INFLIGHT = 4    # Embed requests running at once (shared by all threads)
+EMBED_CACHE_MAX_ENTRIES = 500_000  # On-disk embedding cache size (LRU)
+EMBED_CACHE_HOT_ENTRIES = 10_000   # In-memory hot tier size (LRU)
+CHUNKER = "sentence"      # "sentence" (sentence/paragraph aware) or "fixed" (500 chars every 400)
+CHUNK_MAX_TOKENS = 128    # Sentence chunker: max tokens per chunk
+CHUNK_OVERLAP_SENTENCES = 1  # Sentence chunker: sentences repeated at the start of the next chunk
+DEDUP_SIMILARITY = None   # Cosine similarity above which a chunk counts as a near-duplicate (e.g. 0.97). None = exact only
+VECTOR_INDEX_MIN_ROWS = 50_000     # Build the IVF-PQ index once the table is this big (brute force is fine below)
+VECTOR_INDEX_RETRAIN_GROWTH = 2.0  # Retrain IVF centroids when the table grows by this factor since training
+VECTOR_INDEX_NPROBES = 20          # IVF partitions searched per query
+VECTOR_INDEX_REFINE = 10           # Re-rank refine_factor * top_k PQ candidates with exact distances
+BRAIN_MAINTENANCE_INTERVAL = 900   # Seconds between index/compaction passes (0 = off)
+BRAIN_VERSION_RETENTION_HOURS = 24 # Old table versions kept before pruning
+WRITE_BATCH_ROWS = 2000            # Group commit: append once this many rows are queued...
+WRITE_FLUSH_SECONDS = 2.0          # ...or once the oldest queued row is this old
+WRITE_MAX_PENDING_ROWS = 20_000    # Learners block (backpressure) when this many rows are waiting
+RECALL_MODE = "vector"             # "vector" (embeddings only) or "hybrid" (BM25 + vector, rank-fused; see brain_benchmark.py off_topic_hits)
+RECALL_HYBRID_CANDIDATES = 4       # Hybrid: each ranking fetches top_k * this before fusion
+RECALL_KEYWORD_DISTANCE_FACTOR = 2.0  # Hybrid: keyword hits are kept up to threshold * this distance
+RRF_K = 60                         # Reciprocal rank fusion constant
+RECALL_CACHE_SIZE = 256            # Recent recall results kept (dropped whenever the table changes)
+RECALL_MMR_LAMBDA = 0.7            # MMR diversity: 1.0 = pure relevance, lower = less overlap between results (None = off)
+RECALL_MMR_CANDIDATES = 4          # MMR: pick top_k from top_k * this candidates
+TOPIC_ROUTING = True               # Search the query's nearest topics (plus untagged rows) before the whole table
+TOPIC_ROUTE_TOP_N = 3              # Topics searched per routed query
+TOPIC_ROUTE_MIN_SIMILARITY = 0.5   # Cosine to the best topic centroid below which recall searches globally
+# Compact vector storage (applies when a table is created; migrate with python -m core.reembed)
+# Run vector_storage_report.py to see recall quality vs disk/latency for each setting
+VECTOR_DTYPE = "float32"           # "float32" or "float16" (half the bytes)
+VECTOR_DIM = None                  # Keep only the leading N dimensions, renormalized (e.g. 256). None = full
+RERANK_FULL_PRECISION = True       # Compact tables: re-score candidates with full vectors from the embedding cache
+RERANK_CANDIDATES = 4              # Compact tables: over-fetch top_k * this candidates for the rerank
+# Retention (enforced by the maintenance pass, before compaction)
+RETENTION_TTL_DAYS = {"search": 14, "web": 90}  # Per source kind; kinds not listed never expire
+RETENTION_PROTECTED = ("verified", "user")      # Source kinds never expired or evicted
+MAX_ROWS = 1_000_000               # Row budget: least recently recalled rows are evicted past this (None = unbounded)
+
+# Brain Service (python -m core.brain_service): one process owns the brain, the rest connect to it
+BRAIN_SERVICE_HOST = "127.0.0.1"
+BRAIN_SERVICE_PORT = 11435
+BRAIN_SERVICE_KEY_FILE = BASE_DIR / "brain_data" / "brain_service.key"   # Random per-install authkey, created on first run (0600)
+
+# LLM Gateway (python -m core.llm_gateway): every Ollama call is queued by priority
+# ("interactive" > "normal" > "background"); without the service each process schedules its own calls
+LLM_GATEWAY_HOST = "127.0.0.1"
+LLM_GATEWAY_PORT = 11436
+LLM_GATEWAY_KEY_FILE = BASE_DIR / "brain_data" / "llm_gateway.key"   # Random per-install authkey, created on first run (0600)
+LLM_CONCURRENCY = {"default": 1}   # Generations at once per model (raise with OLLAMA_NUM_PARALLEL)
+LLM_BACKGROUND_QUEUE = 8           # Background calls allowed to wait; more are rejected
+LLM_INTERACTIVE_GRACE = 5.0        # Seconds after an interactive call during which background calls wait
+LLM_PREEMPT_RETRIES = 3            # Times a preempted background call is queued again before giving up
+
+# API response cache (server.py /ask and /chat)
+RESPONSE_CACHE = True              # Reuse answers to repeated / near-identical questions
+RESPONSE_CACHE_SIMILARITY = 0.95   # Cosine similarity for two questions to count as the same
+RESPONSE_CACHE_TTL = 3600          # Seconds an answer stays reusable
+RESPONSE_CACHE_SIZE = 1000         # Answers kept (least recently used evicted first)
 
 # JARVIS personality - YOUR personal companion
 # PROMPTS
@@ -0,0 +1,90 @@
+"""
+JARVIS Action Tags
+Finds [OPEN: app], [SEARCH: query], [LOOK], ... in a streamed LLM reply
+as soon as each tag is complete, so the action can start while the rest
+of the answer is still being generated. The tags are cut out of the text
+that goes to the screen / TTS.
+"""
+import re
+
+COMMANDS = ("OPEN", "CLOSE", "SEARCH", "SYSTEM", "TYPE", "LOOK", "LEARN", "DOC")
+# Only LOOK may come without a parameter
+NO_PARAM = ("LOOK",)
+def _tag_pattern(commands):
+    return re.compile(r"\[\s*(" + "|".join(commands) + r")\s*(?::\s*(.*?))?\s*\]", re.IGNORECASE | re.DOTALL)
+
+TAG = _tag_pattern(COMMANDS)
+# A '[' held back longer than this is just text ([DOC: ...] content can be long)
+MAX_TAG_CHARS = 4000
+
+
+class ActionTagParser:
+    """
+    feed() chunks in order, flush() at the end. Only tags for `commands`
+    are cut out; any other tag stays in the text.
+    """
+    def __init__(self, commands=COMMANDS):
+        self.buffer = ""
+        self.commands = tuple(c.upper() for c in commands)
+        self.tag = TAG if self.commands == COMMANDS else _tag_pattern(self.commands)
+
+    def _pending(self, text):
+        """Could text (starting with '[') still become a tag?"""
+        if "]" in text or len(text) > MAX_TAG_CHARS:
+            return False
+        m = re.match(r"\[\s*([A-Za-z]*)", text)
+        word, rest = m.group(1).upper(), text[m.end():]
+        if not rest:
+            return any(c.startswith(word) for c in self.commands)
+        return word in self.commands and re.fullmatch(r"\s*(:.*)?", rest, re.DOTALL) is not None
+
+    def feed(self, chunk):
+        """(text safe to show, [(COMMAND, param)] completed in this chunk)"""
+        self.buffer += chunk
+        text, tags = [], []
+        while self.buffer:
+            start = self.buffer.find("[")
+            if start == -1:
+                text.append(self.buffer)
+                self.buffer = ""
+                break
+            text.append(self.buffer[:start])
+            self.buffer = self.buffer[start:]
+            m = self.tag.match(self.buffer)
+            if m and (m.group(2) is not None or m.group(1).upper() in NO_PARAM):
+                tags.append((m.group(1).upper(), (m.group(2) or "").strip()))
+                self.buffer = self.buffer[m.end():]
+                continue
+            if self._pending(self.buffer):
+                break   # Wait for the next tokens
+            text.append("[")
+            self.buffer = self.buffer[1:]
+        return "".join(text), tags
+
+    def flush(self):
+        """Whatever is still held back (an unfinished tag is just text)"""
+        text, self.buffer = self.buffer, ""
+        return text
+
+
+def split_actions(chunks, on_action, commands=COMMANDS):
+    """
+    Wrap a chat_stream: yields the reply without its tags and calls
+    on_action(command, param) the moment each tag is complete. Pass the
+    commands a front-end actually runs; other tags are shown as text.
+    """
+    parser = ActionTagParser(commands)
+    try:
+        for chunk in chunks:
+            text, tags = parser.feed(chunk)
+            for command, param in tags:
+                on_action(command, param)
+            if text:
+                yield text
+        rest = parser.flush()
+        if rest:
+            yield rest
+    finally:
+        # Stopping early (barge-in) must still close the LLM stream
+        if hasattr(chunks, "close"):
+            chunks.close()
@@ -9,9 +9,10 @@ import pyautogui
 # from AppOpener import open as app_open
 # from AppOpener import close as app_close
 from duckduckgo_search import DDGS
-import ollama
 import json
 
+from core.llm_gateway import ask, INTERACTIVE
+
 # Safety settings
 pyautogui.FAILSAFE = True
 
@@ -167,8 +168,8 @@ class ActionEngine:
         """
         
         try:
-            res = ollama.chat(model="mixtral", messages=[{'role': 'user', 'content': prompt}])
-            content = res['message']['content']
+            # The user asked for this: interactive priority in the LLM gateway
+            content = ask("prediction", [{'role': 'user', 'content': prompt}], priority=INTERACTIVE)
             # Try to parse JSON (sometimes models add chatter)
             if "{" in content and "}" in content:
                 # Extract JSON part
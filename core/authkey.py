@@ -0,0 +1,32 @@
+"""
+JARVIS Service Keys
+The Brain Service and the LLM Gateway exchange pickled messages, so only
+processes that can read this install's key may connect. Each key is
+random, created on first use under brain_data/ and readable by the owner only.
+"""
+import os
+import secrets
+
+KEY_BYTES = 32
+
+
+def load_authkey(path):
+    """The key stored at path, generated (0600) if it doesn't exist yet"""
+    if not path.exists():
+        path.parent.mkdir(exist_ok=True)
+        # Written in full under a private name, then linked into place: a
+        # process starting at the same moment sees no key or the whole key
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(secrets.token_bytes(KEY_BYTES))
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            pass   # Another process won the race: use its key
+        finally:
+            os.unlink(tmp)
+    elif os.name == "posix" and path.stat().st_mode & 0o077:
+        os.chmod(path, 0o600)
+    with open(path, "rb") as f:
+        return f.read()
@@ -4,10 +4,33 @@ Stores knowledge in LanceDB (Disk-based Vector Store) for infinite scaling.
 """
 import os
 import json
+import atexit
+import time
+import hashlib
+import threading
 import numpy as np
+import pyarrow as pa
 import lancedb
 from pathlib import Path
-from datetime import datetime
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    EMBED_BACKEND, EMBED_MODEL, EMBED_LOCAL_THREADS, EMBED_BATCH_SIZE, EMBED_MAX_INFLIGHT,
+    EMBED_CACHE_MAX_ENTRIES, EMBED_CACHE_HOT_ENTRIES, DEDUP_SIMILARITY,
+    VECTOR_INDEX_MIN_ROWS, VECTOR_INDEX_RETRAIN_GROWTH, VECTOR_INDEX_NPROBES, VECTOR_INDEX_REFINE,
+    BRAIN_MAINTENANCE_INTERVAL, BRAIN_VERSION_RETENTION_HOURS,
+    WRITE_BATCH_ROWS, WRITE_FLUSH_SECONDS, WRITE_MAX_PENDING_ROWS,
+    RECALL_MODE, RECALL_HYBRID_CANDIDATES, RECALL_KEYWORD_DISTANCE_FACTOR, RRF_K, RECALL_CACHE_SIZE,
+    RECALL_MMR_LAMBDA, RECALL_MMR_CANDIDATES,
+    TOPIC_ROUTING, TOPIC_ROUTE_TOP_N, TOPIC_ROUTE_MIN_SIMILARITY,
+    VECTOR_DTYPE, VECTOR_DIM, RERANK_FULL_PRECISION, RERANK_CANDIDATES,
+)
+from core.embed_cache import EmbeddingCache
+from core.chunking import get_chunker
+from core.retention import UsageTracker, expire_by_ttl, evict_over_budget
+from core.topics import TopicCentroids
 
 # We verify ollama import here
 try:
@@ -18,108 +41,1038 @@ except ImportError:
 BRAIN_DIR = Path(__file__).parent.parent / "brain_data"
 BRAIN_DIR.mkdir(exist_ok=True)
 DB_PATH = BRAIN_DIR / "lancedb"
+EMBED_CACHE_PATH = BRAIN_DIR / "embed_cache.sqlite"
+MAINTENANCE_STATE = BRAIN_DIR / "maintenance.json"
+USAGE_PATH = BRAIN_DIR / "usage.sqlite"
+TOPIC_CENTROIDS = BRAIN_DIR / "topic_centroids.npz"
+ACTIVE_TABLE_FILE = BRAIN_DIR / "active_table.json"
+
+# Sources that name a topic after the colon, e.g. "verified:Physics"
+TOPIC_SOURCES = ("verified", "orchestra")
+
+# Columns added after the first release, with the SQL that backfills old rows.
+# Each expression is the SQL twin of _content_hash() / _split_source().
+DERIVED_COLUMNS = {
+    "content_hash": r"encode(sha256(lower(btrim(regexp_replace(text, '\s+', ' ', 'g')))), 'hex')",
+    "source_kind": "split_part(source, ':', 1)",
+    "topic": r"regexp_replace(source, '^(?:(?:" + "|".join(TOPIC_SOURCES) + r"):(.*)|.*)$', '${1}')",
+}
+
+# Scalar indexes so filters and dedup lookups don't scan
+SCALAR_INDEXES = {
+    "content_hash": "BTREE",
+    "source_kind": "BITMAP",
+    "topic": "BITMAP",
+    "timestamp": "BTREE",
+}
+
+def load_active_table():
+    """Which table the brain reads and writes, and the backend/model its vectors came from"""
+    try:
+        with open(ACTIVE_TABLE_FILE, 'r') as f:
+            active = json.load(f)
+        # Pointers written before pluggable embedders were all Ollama
+        active.setdefault("embed_backend", "ollama")
+        return active
+    except:
+        return {"table": "knowledge", "embed_model": EMBED_MODEL, "embed_backend": EMBED_BACKEND}
+
+def save_active_table(table_name, embed_model, embed_backend=EMBED_BACKEND):
+    """Atomically point the brain at another table (os.replace is atomic)"""
+    tmp = ACTIVE_TABLE_FILE.with_suffix(".tmp")
+    with open(tmp, 'w') as f:
+        json.dump({"table": table_name, "embed_model": embed_model, "embed_backend": embed_backend}, f)
+    os.replace(tmp, ACTIVE_TABLE_FILE)
+
+def table_schema(dim, dtype=VECTOR_DTYPE):
+    """Explicit schema, so vectors can be stored as float16"""
+    value_type = pa.float16() if dtype == "float16" else pa.float32()
+    return pa.schema([
+        pa.field("vector", pa.list_(value_type, dim)),
+        pa.field("text", pa.string()),
+        pa.field("source", pa.string()),
+        pa.field("timestamp", pa.string()),
+        pa.field("content_hash", pa.string()),
+        pa.field("source_kind", pa.string()),
+        pa.field("topic", pa.string()),
+    ])
+
+def table_storage(table):
+    """(dim, dtype) of the stored vectors"""
+    vector_type = table.schema.field("vector").type
+    dtype = "float16" if vector_type.value_type == pa.float16() else "float32"
+    return vector_type.list_size, dtype
+
+def compact_vector(vector, dim=None):
+    """
+    Keep the leading dim values and renormalize to unit length.
+    Matryoshka-trained models (nomic-embed-text v1.5) keep most of their
+    quality when truncated this way.
+    """
+    v = np.asarray(vector, dtype=np.float32)
+    if dim and dim < len(v):
+        v = v[:dim]
+        norm = np.linalg.norm(v)
+        if norm:
+            v = v / norm
+    return v.tolist()
+
+class OllamaEmbedder:
+    """Embeddings from the Ollama server over HTTP"""
+    def check(self, model):
+        self.embed(model, ["startup_check"])
+        return "Ollama Embeddings Connected."
+
+    def embed(self, model, texts):
+        """Embed a list of strings in a single request (L2-normalized vectors)"""
+        try:
+            res = ollama.embed(model=model, input=texts)
+            return [list(v) for v in res['embeddings']]
+        except AttributeError:
+            # Older ollama client without /api/embed: one request per text
+            vectors = []
+            for t in texts:
+                v = np.asarray(ollama.embeddings(model=model, prompt=t)['embedding'], dtype=np.float32)
+                norm = np.linalg.norm(v)
+                vectors.append((v / norm if norm else v).tolist())
+            return vectors
+
+
+class LocalEmbedder:
+    """
+    sentence-transformers in this process, on every CPU core. No HTTP round
+    trip, and it keeps working while Ollama is busy generating. Models are
+    loaded on first use, not at startup.
+    """
+    def __init__(self, threads=EMBED_LOCAL_THREADS):
+        self.threads = threads or os.cpu_count()
+        self._models = {}
+        # torch already spreads one batch over all cores: run batches one at a time
+        self._lock = threading.Lock()
+
+    def _model(self, model):
+        if model not in self._models:
+            import torch
+            from sentence_transformers import SentenceTransformer
+            torch.set_num_threads(self.threads)
+            print(f"   ⏳ Loading local embedding model {model} ({self.threads} threads)...")
+            self._models[model] = SentenceTransformer(model, device="cpu")
+        return self._models[model]
+
+    def check(self, model):
+        import importlib.util
+        if importlib.util.find_spec("sentence_transformers") is None:
+            raise ImportError("sentence-transformers is not installed (pip install sentence-transformers)")
+        return f"Local Embeddings Ready ({model}, loads on first use)."
+
+    def embed(self, model, texts):
+        with self._lock:
+            vectors = self._model(model).encode(
+                list(texts),
+                batch_size=EMBED_BATCH_SIZE,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+        return vectors.astype(np.float32).tolist()
+
+
+EMBEDDERS = {
+    "ollama": OllamaEmbedder,
+    "local": LocalEmbedder,
+}
+_embedders = {}
+
+def get_embedder(backend=EMBED_BACKEND):
+    """One shared embedder per backend (a local model is loaded once per process)"""
+    if backend not in _embedders:
+        _embedders[backend] = EMBEDDERS[backend]()
+    return _embedders[backend]
+
+def embed_texts(model, texts, backend=EMBED_BACKEND):
+    """Embed a list of strings (L2-normalized vectors)"""
+    return get_embedder(backend).embed(model, texts)
+
+def _unit_rows(vectors):
+    """Scale each row to unit length (all-zero rows stay as they are)"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+def _vector_matrix(data, dim):
+    """(rows, dim) float32 matrix from a RecordBatch or Table"""
+    column = data["vector"]
+    if isinstance(column, pa.ChunkedArray):
+        column = column.combine_chunks()
+    return column.flatten().to_numpy(zero_copy_only=False).astype(np.float32).reshape(-1, dim)
+
+def vectors_normalized(table, sample_rows=256):
+    """
+    Are the stored vectors unit length? Tables written through
+    ollama.embeddings (before the switch to ollama.embed) are not, and their
+    L2 distances no longer line up with the normalized query vectors.
+    """
+    data = table.search().select(["vector"]).limit(sample_rows).to_arrow()
+    if not data.num_rows:
+        return True
+    norms = np.linalg.norm(_vector_matrix(data, table_storage(table)[0]), axis=1)
+    norms = norms[norms > 0]
+    # float16 storage is only unit length to about 1e-3
+    return bool(np.all(np.abs(norms - 1) < 0.02))
+
+def normalize_vectors(table, batch_rows=8192):
+    """
+    Rewrite every stored vector at unit length. Same model, same direction,
+    so nothing is re-embedded. The rewrite drops the indexes: ensure_schema
+    rebuilds the scalar/FTS ones, maintenance the vector index.
+    """
+    dim = table_storage(table)[0]
+    schema = table.schema
+    vector_type = schema.field("vector").type
+
+    def batches():
+        for batch in table.search().select(schema.names).limit(None).to_batches(batch_rows):
+            vectors = _unit_rows(_vector_matrix(batch, dim))
+            column = pa.FixedSizeListArray.from_arrays(pa.array(vectors.ravel()), dim).cast(vector_type)
+            arrays = [column if name == "vector" else batch[name] for name in schema.names]
+            yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    table.add(pa.RecordBatchReader.from_batches(schema, batches()), mode="overwrite")
+
+def ensure_schema(table):
+    """
+    Upgrade tables from older versions: backfill derived columns, normalize
+    legacy vectors, build missing indexes.
+    Returns True if the stored vectors were rewritten.
+    """
+    missing = {c: sql for c, sql in DERIVED_COLUMNS.items() if c not in table.schema.names}
+    if missing:
+        print(f"   🔧 Upgrading knowledge table (adding {', '.join(missing)})...")
+        table.add_columns(missing)
+    renormalized = False
+    if not vectors_normalized(table):
+        print(f"   🔧 Normalizing {table.count_rows()} legacy vectors to unit length...")
+        normalize_vectors(table)
+        renormalized = True
+    indexed = [idx.columns for idx in table.list_indices()]
+    for column, index_type in SCALAR_INDEXES.items():
+        if [column] not in indexed:
+            table.create_scalar_index(column, index_type=index_type)
+    if ["text"] not in indexed:
+        # BM25 keyword index for hybrid recall (kept current by optimize())
+        table.create_fts_index("text", replace=True)
+    return renormalized
+
+def stored_hashes(table, hashes):
+    """Which of these content hashes are already in the table (BTree index lookup)"""
+    known = set()
+    if table is None or not hashes:
+        return known
+    for i in range(0, len(hashes), 500):
+        part = hashes[i:i+500]
+        in_list = ",".join(f"'{h}'" for h in part)
+        rows = table.search().where(f"content_hash IN ({in_list})").select(["content_hash"]).limit(None).to_list()
+        known.update(r["content_hash"] for r in rows)
+    return known
+
+def _content_hash(text):
+    """Hash of whitespace/case-normalized text, so trivial variants collide"""
+    return hashlib.sha256(" ".join(text.split()).lower().encode("utf-8")).hexdigest()
+
+def _split_source(source):
+    """'verified:Physics' -> ('verified', 'Physics'); 'web' -> ('web', '')"""
+    kind, _, rest = source.partition(":")
+    return kind, rest if kind in TOPIC_SOURCES else ""
+
+def _sql_str(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+def _build_filter(source_prefix=None, topic=None, since=None, until=None):
+    """
+    SQL predicate for recall filters.
+    source_prefix: "verified" / "verified:" match the source kind (indexed);
+                   longer prefixes like "vision:https://" fall back to LIKE.
+    since/until: datetime or ISO string bounds on timestamp.
+    """
+    clauses = []
+    if source_prefix:
+        kind, _, rest = source_prefix.partition(":")
+        if rest:
+            escaped = source_prefix.replace("'", "''").replace("%", "\\%").replace("_", "\\_")
+            clauses.append(f"source LIKE '{escaped}%'")
+        else:
+            clauses.append(f"source_kind = {_sql_str(kind)}")
+    if topic:
+        clauses.append(f"topic = {_sql_str(topic)}")
+    if since:
+        clauses.append(f"timestamp >= {_sql_str(since.isoformat() if isinstance(since, datetime) else since)}")
+    if until:
+        clauses.append(f"timestamp < {_sql_str(until.isoformat() if isinstance(until, datetime) else until)}")
+    return " AND ".join(clauses) or None
+
+def _rrf_fuse(rankings, k=RRF_K):
+    """
+    Reciprocal rank fusion: score = sum(1 / (k + rank)) over every ranking
+    a row appears in. Rows are matched by content_hash.
+    """
+    scores = {}
+    rows = {}
+    for ranking in rankings:
+        for rank, r in enumerate(ranking):
+            key = r["content_hash"]
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+            # Keep the vector hit's _distance when a row is in both rankings
+            rows[key] = {**r, **rows.get(key, {})}
+    fused = sorted(scores, key=scores.get, reverse=True)
+    return [{**rows[key], "_rrf_score": scores[key]} for key in fused]
+
+def _mmr(results, relevance, k, lam):
+    """
+    Maximal marginal relevance: greedily pick k rows, each maximizing
+    lam * relevance - (1 - lam) * (max similarity to the rows already picked).
+    All similarities come from one matrix product.
+    """
+    if len(results) <= k:
+        return results
+    vectors = np.asarray([r["vector"] for r in results], dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+    sims = vectors @ vectors.T
+    relevance = np.asarray(relevance, dtype=np.float32)
+    
+    picked = [int(np.argmax(relevance))]
+    redundancy = sims[picked[0]].copy()
+    for _ in range(k - 1):
+        scores = lam * relevance - (1 - lam) * redundancy
+        scores[picked] = -np.inf
+        best = int(np.argmax(scores))
+        picked.append(best)
+        np.maximum(redundancy, sims[best], out=redundancy)
+    return [results[i] for i in picked]
+
+class RecallCache:
+    """
+    LRU of recall results keyed by normalized query + search parameters.
+    Entries belong to one table version: any write, compaction or
+    re-index bumps the version and empties the cache.
+    """
+    def __init__(self, max_entries=RECALL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query, *params):
+        return (" ".join(query.lower().split()),) + params
+
+    def get(self, key, version):
+        with self._lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            results, elapsed = entry
+            self.hits += 1
+            self.seconds_saved += elapsed
+            return list(results)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.version = None
+
+    def put(self, key, version, results, elapsed):
+        with self._lock:
+            if version != self.version:
+                return
+            self.entries[key] = (list(results), elapsed)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "seconds_saved": round(self.seconds_saved, 3),
+            "entries": len(self.entries),
+        }
+
+class WriteBehind:
+    """
+    Background writer with group commit.
+    Any thread can submit rows; one thread appends them in large batches,
+    when WRITE_BATCH_ROWS are queued or the oldest row is WRITE_FLUSH_SECONDS old.
+    submit() blocks while WRITE_MAX_PENDING_ROWS are waiting (backpressure).
+    """
+    def __init__(self, write_fn, batch_rows=WRITE_BATCH_ROWS, flush_seconds=WRITE_FLUSH_SECONDS,
+                 max_pending_rows=WRITE_MAX_PENDING_ROWS):
+        self.write_fn = write_fn
+        self.batch_rows = batch_rows
+        self.flush_seconds = flush_seconds
+        self.max_pending_rows = max_pending_rows
+        
+        self._cond = threading.Condition()
+        self._pending = []
+        self._pending_hashes = set()
+        self._oldest = None
+        self._submitted = 0   # Rows ever submitted
+        self._done = 0        # Rows ever written (or dropped on error)
+        self._flush_now = False
+        self.commits = 0
+        threading.Thread(target=self._run, daemon=True, name="brain-writer").start()
+
+    def submit(self, rows):
+        with self._cond:
+            while self._pending and len(self._pending) + len(rows) > self.max_pending_rows:
+                self._cond.wait()
+            # Another learner may have queued the same chunk since our dedup check
+            rows = [r for r in rows if r["content_hash"] not in self._pending_hashes]
+            if not rows:
+                return
+            if not self._pending:
+                self._oldest = time.time()
+            self._pending.extend(rows)
+            self._pending_hashes.update(r["content_hash"] for r in rows)
+            self._submitted += len(rows)
+            self._cond.notify_all()
+
+    def pending_hashes(self, hashes):
+        """Which of these hashes are queued but not yet written"""
+        with self._cond:
+            return {h for h in hashes if h in self._pending_hashes}
+
+    def flush(self, timeout=None):
+        """Write everything submitted so far. Returns False on timeout."""
+        with self._cond:
+            target = self._submitted
+            self._flush_now = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._done >= target, timeout)
+
+    def _ready(self):
+        if not self._pending:
+            return False
+        return (self._flush_now
+                or len(self._pending) >= self.batch_rows
+                or time.time() - self._oldest >= self.flush_seconds)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._ready():
+                    self._cond.wait(timeout=self.flush_seconds / 4)
+                batch, self._pending = self._pending, []
+                self._flush_now = False
+                
+            try:
+                if self.write_fn(batch):
+                    self.commits += 1
+                    print(f"   💾 Committed {len(batch)} concepts to the brain.")
+            except Exception as e:
+                print(f"❌ Write-behind error: {e}")
+                
+            with self._cond:
+                # Hashes are only released once the rows are visible in the table
+                self._pending_hashes.difference_update(r["content_hash"] for r in batch)
+                self._done += len(batch)
+                self._cond.notify_all()
 
 class Brain:
     def __init__(self):
         print("🧠 Initializing Neural Pathways (LanceDB + Ollama)...")
+        active = load_active_table()
+        self.table_name = active["table"]
         try:
-            # We use Ollama for embeddings (nomic-embed-text)
-            self.embed_model = "nomic-embed-text" 
+            # Queries must use the backend and model the table was built with
+            self.embed_model = active["embed_model"]
+            self.embed_backend = active["embed_backend"]
+            if (self.embed_backend, self.embed_model) != (EMBED_BACKEND, EMBED_MODEL):
+                print(f"   ⚠️ Table '{self.table_name}' uses {self.embed_backend}/{self.embed_model}, "
+                      f"config says {EMBED_BACKEND}/{EMBED_MODEL}.")
+                print(f"   (Run 'python -m core.reembed {EMBED_MODEL}' to migrate)")
             
             # Test connection
-            ollama.embeddings(model=self.embed_model, prompt="startup_check")
+            status = get_embedder(self.embed_backend).check(self.embed_model)
             self.has_model = True
-            print("   ✅ Ollama Embeddings Connected.")
+            print(f"   ✅ {status}")
         except Exception as e:
             print(f"⚠️ Embedding model error: {e}")
             print("   (Make sure 'ollama pull nomic-embed-text' was run)")
             self.has_model = False
             
+        # Shared pool: bounds embed requests in flight across all learner threads
+        self._embed_pool = ThreadPoolExecutor(max_workers=EMBED_MAX_INFLIGHT, thread_name_prefix="brain-embed")
+        self.embed_cache = EmbeddingCache(EMBED_CACHE_PATH, EMBED_CACHE_MAX_ENTRIES, EMBED_CACHE_HOT_ENTRIES)
+        self.recall_cache = RecallCache()
+        self.usage = UsageTracker(USAGE_PATH)
+        self.chunker = get_chunker()
+            
         # Connect to LanceDB
         self.db = lancedb.connect(str(DB_PATH))
         self.table = None
         
         # Open table if exists
+        renormalized = False
         try:
-            if "knowledge" in self.db.table_names():
-                self.table = self.db.open_table("knowledge")
+            if self.table_name in self.db.table_names():
+                self.table = self.db.open_table(self.table_name)
+                renormalized = ensure_schema(self.table)
         except:
             pass
+        self._active_mtime = self._active_table_mtime()
+        # Bumped on every table switch: rows embedded before it are re-embedded on write
+        self._table_epoch = 0
+        self._switch_lock = threading.Lock()
+        # Per-topic centroids for routed recall (built by maintenance if missing)
+        self.topics = TopicCentroids(TOPIC_CENTROIDS, self.table_name)
+        if renormalized:
+            # Saved centroids summed the old, unnormalized vectors
+            self.topics.ready = False
+            
+        # All appends go through one writer thread (group commit)
+        self.writer = WriteBehind(self._write)
+        atexit.register(self.flush)
+        atexit.register(self.usage.save)
+        atexit.register(lambda: self.topics.save())
+            
+        # Background index upkeep + fragment compaction
+        if BRAIN_MAINTENANCE_INTERVAL:
+            threading.Thread(target=self._maintenance_loop, daemon=True, name="brain-maintenance").start()
+
+    @property
+    def embed_id(self):
+        """Embedding cache namespace: the same model name can come from different backends"""
+        if self.embed_backend == "ollama":
+            return self.embed_model
+        return f"{self.embed_backend}:{self.embed_model}"
+
+    def _embed_batch(self, texts):
+        return embed_texts(self.embed_model, texts, self.embed_backend)
+
+    def _embed_many(self, texts):
+        """
+        Embed many strings. Cached vectors are reused; the misses are sent
+        as batches, with a bounded number of batches in flight.
+        """
+        vectors = self.embed_cache.get_many(self.embed_id, texts)
+        # Unique misses only: repeated chunks are embedded once
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if not missing:
+            return vectors
+            
+        batches = [missing[i:i+EMBED_BATCH_SIZE] for i in range(0, len(missing), EMBED_BATCH_SIZE)]
+        fresh = []
+        # map() keeps batch order, so vectors line up with texts
+        for batch_vectors in self._embed_pool.map(self._embed_batch, batches):
+            fresh.extend(batch_vectors)
+        self.embed_cache.put_many(self.embed_id, missing, fresh)
+        
+        by_text = dict(zip(missing, fresh))
+        return [v if v is not None else by_text[t] for t, v in zip(texts, vectors)]
+
+    def _stored_dim(self):
+        """Dimension vectors are stored (and queried) at"""
+        if self.table is not None:
+            return table_storage(self.table)[0]
+        return VECTOR_DIM
+
+    def _rerank_full(self, query_embedding, results):
+        """
+        Re-score candidates from a compact table with full-precision vectors
+        (from the embedding cache). Rows whose vector was evicted from the
+        cache keep their compact distance.
+        """
+        full = self.embed_cache.get_many(self.embed_id, [r["text"] for r in results])
+        hit = [i for i, v in enumerate(full) if v is not None]
+        if hit:
+            mat = np.asarray([full[i] for i in hit], dtype=np.float32)
+            # Unit vectors: squared L2 = 2 - 2cos, same scale as LanceDB's _distance
+            distances = 2 - 2 * (mat @ np.asarray(query_embedding, dtype=np.float32))
+            for i, d in zip(hit, distances.tolist()):
+                results[i] = {**results[i], "_distance": d}
+        return sorted(results, key=lambda r: r["_distance"])
+
+    def _has_vector_index(self):
+        return any(idx.columns == ["vector"] for idx in self.table.list_indices())
+
+    def _load_maintenance_state(self):
+        try:
+            with open(MAINTENANCE_STATE, 'r') as f:
+                return json.load(f)
+        except:
+            return {}
+
+    def _save_maintenance_state(self, state):
+        try:
+            with open(MAINTENANCE_STATE, 'w') as f:
+                json.dump(state, f)
+        except:
+            pass
+
+    def _build_vector_index(self, rows):
+        """Train an IVF-PQ index sized for the current row count"""
+        dim = self.table.schema.field("vector").type.list_size
+        # ~sqrt(N) partitions with >= 256 training rows each; PQ sub-vectors must divide the dimension
+        num_partitions = max(1, min(int(np.sqrt(rows)), rows // 256))
+        num_sub_vectors = next(d for d in range(max(1, dim // 8), 0, -1) if dim % d == 0)
+        print(f"   🗂️ Building vector index ({rows} rows, {num_partitions} partitions)...")
+        start = time.time()
+        self.table.create_index(
+            metric="l2",
+            num_partitions=num_partitions,
+            num_sub_vectors=num_sub_vectors,
+            index_type="IVF_PQ",
+            replace=True
+        )
+        print(f"   ✓ Vector index ready in {time.time() - start:.1f}s.")
+
+    def maintain(self):
+        """
+        One upkeep pass over the knowledge table:
+        - pick up rows committed by other processes
+        - expire rows past their source's TTL, then evict the least recently
+          recalled rows over MAX_ROWS
+        - rebuild the topic centroids if they no longer match the table
+          (or were never built)
+        - build the IVF-PQ index once the table is big enough
+        - retrain it after the table has grown VECTOR_INDEX_RETRAIN_GROWTH times
+        - otherwise fold new rows into the existing indexes, compact small
+          fragments and prune versions older than the retention window
+        """
+        if self.table is None:
+            return
+        state = self._load_maintenance_state()
+        # See rows other processes committed (core.snapshot imports)
+        self.table.checkout_latest()
+        
+        # Retention first, so compaction below reclaims the deleted rows
+        self.usage.save()
+        expired = expire_by_ttl(self.table)
+        evicted = len(evict_over_budget(self.table, self.usage))
+        state["rows_expired"] = state.get("rows_expired", 0) + expired
+        state["rows_evicted"] = state.get("rows_evicted", 0) + evicted
+        # Centroids are running sums: rows deleted (or imported by another
+        # process) since they were built can only be accounted for by a rebuild
+        if not self.topics.ready or self.topics.rows != self.table.count_rows("topic != ''"):
+            print(f"   🧭 Topic centroids: {self.topics.rebuild(self.table)} topics.")
+        else:
+            self.topics.save()
+        rows = self.table.count_rows()
+        
+        if not self._has_vector_index():
+            if rows >= VECTOR_INDEX_MIN_ROWS:
+                self._build_vector_index(rows)
+                state["index_trained_rows"] = rows
+        elif rows >= state.get("index_trained_rows", rows) * VECTOR_INDEX_RETRAIN_GROWTH:
+            # Centroids trained on a much smaller table no longer fit the data
+            self._build_vector_index(rows)
+            state["index_trained_rows"] = rows
+            
+        # Compaction + incremental index update + version pruning
+        self.table.optimize(cleanup_older_than=timedelta(hours=BRAIN_VERSION_RETENTION_HOURS))
+        state["last_maintenance"] = time.time()
+        self._save_maintenance_state(state)
+
+    def _active_table_mtime(self):
+        try:
+            return os.path.getmtime(ACTIVE_TABLE_FILE)
+        except OSError:
+            return None
+
+    def switch_table(self):
+        """Re-read the active table pointer (after a re-embed migration) and swap tables"""
+        self.flush()
+        with self._switch_lock:
+            self._open_active_table()
+
+    def _follow_active_table(self):
+        """
+        Swap tables as soon as a migration moves the pointer (one stat() per call),
+        so no write lands in the old table after core.reembed's catch-up.
+        """
+        if self._active_table_mtime() == self._active_mtime:
+            return
+        with self._switch_lock:
+            if self._active_table_mtime() != self._active_mtime:
+                self._open_active_table()
+
+    def _open_active_table(self):
+        """(caller holds _switch_lock)"""
+        mtime = self._active_table_mtime()
+        active = load_active_table()
+        table = self.db.open_table(active["table"])
+        self.table_name = active["table"]
+        self.embed_model = active["embed_model"]
+        self.embed_backend = active["embed_backend"]
+        self.table = table
+        self.topics = TopicCentroids(TOPIC_CENTROIDS, self.table_name)
+        self.recall_cache.clear()
+        self._table_epoch += 1
+        self._active_mtime = mtime
+        print(f"   🔀 Brain switched to '{self.table_name}' ({self.embed_backend}/{self.embed_model}).")
+
+    def _maintenance_loop(self):
+        while True:
+            time.sleep(BRAIN_MAINTENANCE_INTERVAL)
+            try:
+                if self._active_table_mtime() != self._active_mtime:
+                    self.switch_table()
+                self.maintain()
+            except Exception as e:
+                print(f"   ⚠️ Brain maintenance failed: {e}")
+
+    def _known_hashes(self, hashes):
+        """Which of these content hashes are already stored or queued"""
+        if not hashes:
+            return set()
+        known = self.writer.pending_hashes(hashes)
+        return known | self._stored_hashes([h for h in hashes if h not in known])
+
+    def _stored_hashes(self, hashes):
+        """Which of these content hashes are already in the table (BTree index lookup)"""
+        return stored_hashes(self.table, hashes)
+
+    def _near_duplicates(self, vectors):
+        """
+        Indexes of vectors within DEDUP_SIMILARITY of an earlier vector in the
+        batch or of a stored row. Vectors are unit length, so cosine = dot.
+        """
+        if DEDUP_SIMILARITY is None or not vectors:
+            return set()
+        mat = np.asarray(vectors, dtype=np.float32)
+        sims = mat @ mat.T
+        # Only compare against earlier chunks (strict upper triangle)
+        sims = np.triu(sims, k=1) >= DEDUP_SIMILARITY
+        dupes = set(np.nonzero(sims.any(axis=0))[0].tolist())
+        
+        if self.table is not None:
+            # LanceDB _distance is squared L2: for unit vectors cos = 1 - d/2
+            max_distance = 2 * (1 - DEDUP_SIMILARITY)
+            for i, v in enumerate(vectors):
+                if i in dupes:
+                    continue
+                hit = self.table.search(compact_vector(v, self._stored_dim())).limit(1).to_list()
+                if hit and hit[0]["_distance"] <= max_distance:
+                    dupes.add(i)
+        return dupes
+
+    def _write(self, data):
+        """Append rows to the knowledge table, creating it on first write (writer thread only)"""
+        try:
+            self._follow_active_table()
+        except Exception as e:
+            print(f"   ⚠️ Could not switch to the new active table: {e}")
+        stale = [r for r in data if r.pop("_epoch", self._table_epoch) != self._table_epoch]
+        if stale:
+            # Embedded for the table we just left: its model or storage format may differ
+            try:
+                vectors = self._embed_many([r["text"] for r in stale])
+            except Exception as e:
+                print(f"❌ Error re-embedding rows for '{self.table_name}': {e}")
+                return False
+            dim = self._stored_dim()
+            for r, v in zip(stale, vectors):
+                r["vector"] = compact_vector(v, dim)
+        if self.table is None:
+            # Create table
+            try:
+                schema = table_schema(len(data[0]["vector"]))
+                self.table = self.db.create_table(self.table_name, data, schema=schema)
+                ensure_schema(self.table)
+                # A new table: the centroids start empty and stay complete
+                self.topics.clear()
+            except Exception as e:
+                print(f"❌ Error creating table: {e}")
+                return False
+        else:
+            try:
+                # Final check: a row may have been written after the learner's dedup lookup
+                stored = self._stored_hashes([r["content_hash"] for r in data])
+                data = [r for r in data if r["content_hash"] not in stored]
+                if not data:
+                    return False
+                self.table.add(data)
+            except Exception as e:
+                print(f"❌ Error adding data (Possible dimension mismatch? See 'python -m core.reembed'): {e}")
+                return False
+        self.topics.add(data)
+        return True
+
+    def stats(self):
+        """Cache effectiveness and write-behind counters"""
+        return {
+            "recall_cache": self.recall_cache.stats(),
+            "embed_cache": self.embed_cache.stats(),
+            "group_commits": self.writer.commits,
+        }
+
+    def flush(self, timeout=None):
+        """Block until every learned chunk is written to the table"""
+        return self.writer.flush(timeout)
 
     def learn(self, text: str, source: str = "user"):
         """Ingest text into the brain"""
+        return self.learn_many([(text, source)])
+
+    def learn_many(self, docs):
+        """
+        Bulk ingest. Documents are chunked lazily and flow through in windows
+        of EMBED_BATCH_SIZE * EMBED_MAX_INFLIGHT chunks: dedup, batched
+        embedding, then the background writer (see flush()).
+        docs: iterable of texts or (text, source) tuples. A text may be a
+              string or any iterable of string pieces (e.g. a streamed page).
+        Returns the number of chunks queued.
+        """
         if not self.has_model:
             print("❌ ERROR: Brain has no embedding model. Cannot learn.")
-            return
-        if not text.strip():
-            return
+            return 0
             
-        print(f"🧠 Learning from {source}...")
-        
-        # Chunking
-        raw_chunks = [text[i:i+500] for i in range(0, len(text), 400)]
-        embeddings = []
+        start = time.time()
+        window_size = EMBED_BATCH_SIZE * EMBED_MAX_INFLIGHT
+        window = []   # (chunk, source, hash)
+        seen = set()
+        total = 0
+        stored = 0
+        for doc in docs:
+            text, source = (doc, "user") if isinstance(doc, str) else doc
+            if not text or (isinstance(text, str) and not text.strip()):
+                continue
+            print(f"🧠 Learning from {source}...")
+            for chunk in self.chunker(text):
+                total += 1
+                h = _content_hash(chunk)
+                if h in seen:
+                    continue
+                seen.add(h)
+                window.append((chunk, source, h))
+                if len(window) >= window_size:
+                    stored += self._ingest_window(window)
+                    window = []
+        if window:
+            stored += self._ingest_window(window)
+        if not total:
+            return 0
+            
+        if stored:
+            elapsed = max(time.time() - start, 1e-6)
+            print(f"   ✓ Absorbed {stored} new concepts, skipped {total - stored} duplicates ({stored/elapsed:.1f} chunks/sec).")
+        else:
+            print(f"   ✓ Already knew all {total} concepts.")
+        return stored
+
+    def _ingest_window(self, window):
+        """Dedup, embed and queue one window of (chunk, source, hash)"""
+        # Exact duplicates are dropped before embedding, so they cost nothing
+        try:
+            known = self._known_hashes([h for _, _, h in window])
+        except Exception as e:
+            print(f"   ⚠️ Dedup lookup failed ({e}), storing all chunks.")
+            known = set()
+        window = [w for w in window if w[2] not in known]
+        if not window:
+            return 0
+        chunks = [c for c, _, _ in window]
+        # Taken before embedding: a table switch from here on marks these rows stale
+        epoch = self._table_epoch
         
         try:
-            for chunk in raw_chunks:
-                res = ollama.embeddings(model=self.embed_model, prompt=chunk)
-                embeddings.append(res['embedding'])
+            embeddings = self._embed_many(chunks)
         except Exception as e:
             print(f"❌ Error generating embeddings: {e}")
-            return
+            return 0
+            
+        try:
+            near = self._near_duplicates(embeddings)
+        except Exception as e:
+            print(f"   ⚠️ Near-duplicate check failed ({e}), skipping it.")
+            near = set()
         
+        now = datetime.now().isoformat()
+        dim = self._stored_dim()
         data = []
-        for i, chunk in enumerate(raw_chunks):
+        for i, (chunk, source, h) in enumerate(window):
+            if i in near:
+                continue
+            kind, topic = _split_source(source)
             entry = {
-                "vector": embeddings[i],
+                "vector": compact_vector(embeddings[i], dim),
                 "text": chunk,
                 "source": source,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now,
+                "content_hash": h,
+                "source_kind": kind,
+                "topic": topic,
+                "_epoch": epoch,   # Stripped by _write
             }
             data.append(entry)
             
-        if self.table is None:
-            # Create table
-            try:
-                self.table = self.db.create_table("knowledge", data)
-            except Exception as e:
-                print(f"❌ Error creating table: {e}")
-        else:
-            try:
-                self.table.add(data)
-            except Exception as e:
-                print(f"❌ Error adding data (Possible dimension mismatch?): {e}")
-            
-        print(f"   ✓ Absorbed {len(raw_chunks)} new concepts.")
+        if data:
+            self.writer.submit(data)
+        return len(data)
 
-    def recall(self, query: str, top_k=3, threshold=0.5):
+    def _vector_search(self, query_embedding, limit, where=None):
+        # nprobes/refine only matter once the IVF-PQ index exists
+        search = self.table.search(query_embedding)
+        if where:
+            # Prefilter: filter first, so every top-k slot is a matching row
+            search = search.where(where, prefilter=True)
+        return (
+            search
+            .limit(limit)
+            .nprobes(VECTOR_INDEX_NPROBES)
+            .refine_factor(VECTOR_INDEX_REFINE)
+            .to_list()
+        )
+
+    def _keyword_search(self, query, limit, where=None):
+        """BM25 full-text search over the text column"""
+        try:
+            search = self.table.search(query, query_type="fts")
+            if where:
+                search = search.where(where, prefilter=True)
+            return search.limit(limit).to_list()
+        except Exception:
+            # No FTS index yet, or the query has nothing searchable
+            return []
+
+    def recall(self, query: str, top_k=3, threshold=0.5, mode=None,
+               source_prefix=None, topic=None, since=None, until=None, diversity=None):
         """
         Retrieve relevant knowledge with metadata.
         threshold: Max distance for relevance (lower = stricter). 
                    0.0 = exact match, 1.0 = somewhat loosely related.
+        mode: "vector" or "hybrid" (defaults to RECALL_MODE). Hybrid also runs
+              a keyword search and fuses both rankings, so exact names and terms
+              are found even when their embedding is not close enough.
+        source_prefix / topic / since / until: only search matching rows
+              (e.g. source_prefix="verified:", topic="Physics"). Filters run
+              inside LanceDB on indexed columns, before the top-k cut.
+        diversity: MMR lambda (defaults to RECALL_MMR_LAMBDA). Below 1.0, the
+              top_k is picked from a larger candidate set so that overlapping
+              chunks don't crowd out other information. 1.0 = pure relevance.
         """
+        try:
+            self._follow_active_table()
+        except Exception:
+            pass
         if not self.has_model or self.table is None:
             return []
+        mode = mode or RECALL_MODE
+        diversity = RECALL_MMR_LAMBDA if diversity is None else diversity
             
         try:
-            res = ollama.embeddings(model=self.embed_model, prompt=query)
-            query_embedding = res['embedding']
-            
-            # Search
-            results = self.table.search(query_embedding).limit(top_k).to_list()
-            
-            # Filter by relevance (Distance check)
-            # Note: LanceDB returns '_distance'. Lower is closer.
-            filtered = [r for r in results if r['_distance'] < threshold]
-            
-            if len(filtered) < len(results):
-                print(f"      (Filtered {len(results)-len(filtered)} irrelevant memories)")
-                
-            return filtered 
+            version = self.table.version
+            where = _build_filter(source_prefix, topic, since, until)
+            cache_key = RecallCache.key(query, top_k, threshold, mode, where, diversity)
+            results = self.recall_cache.get(cache_key, version)
+            if results is None:
+                start = time.time()
+                results = self._recall(query, top_k, threshold, mode, where, diversity, route=topic is None)
+                self.recall_cache.put(cache_key, version, results, time.time() - start)
+            # Hits keep rows alive under the row budget
+            self.usage.touch(r["content_hash"] for r in results)
+            return results
         except Exception as e:
             # print(f"Recall error: {e}")
             return []
 
+    def _route(self, stored_embedding, source_kind=None):
+        """Nearest topics for a query embedding (already compacted to the table's format)"""
+        return self.topics.route(stored_embedding, TOPIC_ROUTE_TOP_N, TOPIC_ROUTE_MIN_SIMILARITY, source_kind)
+
+    def embed_query(self, query: str):
+        """
+        A query's full-precision unit embedding. recall() embeds the same
+        text, so right after a recall this is an embedding cache hit.
+        """
+        return self._embed_many([query])[0]
+
+    def topic_for(self, query: str, source_kind=None):
+        """
+        The topic a query is about (nearest centroid), or None when no topic is
+        close enough. source_kind="verified" only considers verified knowledge.
+        """
+        if not self.has_model or self.table is None:
+            return None
+        try:
+            stored = compact_vector(self._embed_many([query])[0], self._stored_dim())
+            routed = self._route(stored, source_kind)
+            return routed[0][0] if routed else None
+        except Exception:
+            return None
+
+    def _recall(self, query, top_k, threshold, mode, where=None, diversity=None, route=False):
+        """
+        Uncached recall. With topic routing, search the query's nearest topics
+        (and rows without a topic) first; search everything if that finds
+        fewer than top_k results or no topic is close enough.
+        """
+        query_embedding = self._embed_many([query])[0]
+        stored = compact_vector(query_embedding, self._stored_dim())
+        if route and TOPIC_ROUTING:
+            routed = self._route(stored)
+            if routed:
+                names = ",".join(_sql_str(t) for t, _ in routed)
+                clause = f"(topic IN ({names}) OR topic = '')"
+                results = self._search(query, query_embedding, stored, top_k, threshold, mode,
+                                       f"{where} AND {clause}" if where else clause, diversity)
+                if len(results) >= top_k:
+                    return results
+        return self._search(query, query_embedding, stored, top_k, threshold, mode, where, diversity)
+
+    def _search(self, query, query_embedding, stored, top_k, threshold, mode, where, diversity):
+        """One vector (+ keyword) search, threshold, fusion and MMR"""
+        compact = len(stored) < len(query_embedding) or table_storage(self.table)[1] == "float16"
+        rerank = compact and RERANK_FULL_PRECISION
+        
+        # Search (over-fetch when MMR picks the final top_k)
+        diverse = diversity is not None and diversity < 1.0
+        pool = top_k * RECALL_MMR_CANDIDATES if diverse else top_k
+        limit = pool * RECALL_HYBRID_CANDIDATES if mode == "hybrid" else pool
+        if rerank:
+            results = self._vector_search(stored, limit * RERANK_CANDIDATES, where)
+            results = self._rerank_full(query_embedding, results)[:limit]
+        else:
+            results = self._vector_search(stored, limit, where)
+        
+        # Filter by relevance (Distance check)
+        # Note: LanceDB returns '_distance'. Lower is closer.
+        filtered = [r for r in results if r['_distance'] < threshold]
+        
+        if mode == "hybrid":
+            # Keyword hits get a looser distance cut: exact terms may match text the
+            # embedding ranks lower, but one shared common word is not relevance
+            keyword = self._keyword_search(query, limit, where)
+            if keyword:
+                query_vector = np.asarray(stored, dtype=np.float32)
+                vectors = np.asarray([r["vector"] for r in keyword], dtype=np.float32)
+                distances = ((vectors - query_vector) ** 2).sum(axis=1)
+                keyword = [{**r, "_distance": float(d)} for r, d in zip(keyword, distances)
+                           if d < threshold * RECALL_KEYWORD_DISTANCE_FACTOR]
+            fused = _rrf_fuse([filtered, keyword])[:pool]
+            if diverse and fused:
+                # Fused rank is the relevance signal, scaled to [0, 1]
+                best = fused[0]["_rrf_score"]
+                return _mmr(fused, [r["_rrf_score"] / best for r in fused], top_k, diversity)
+            return fused[:top_k]
+        
+        if len(filtered) < len(results):
+            print(f"      (Filtered {len(results)-len(filtered)} irrelevant memories)")
+        
+        if diverse:
+            # Squared L2 of unit vectors -> cosine similarity
+            return _mmr(filtered, [1 - r["_distance"] / 2 for r in filtered], top_k, diversity)
+        return filtered
+
 # Test
 if __name__ == "__main__":
     b = Brain()
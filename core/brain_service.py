@@ -0,0 +1,152 @@
+"""
+JARVIS Brain Service
+One process owns the LanceDB table (single writer, one warm cache and index);
+jarvis.py, chatbot.py, server.py, orchestra.py and autolearn.py talk to it
+over localhost through BrainClient, which keeps the Brain API.
+
+Run with: python -m core.brain_service
+"""
+import threading
+from multiprocessing.connection import Listener, Client
+
+from config import BRAIN_SERVICE_HOST, BRAIN_SERVICE_PORT, BRAIN_SERVICE_KEY_FILE
+from core.authkey import load_authkey
+
+# The only Brain methods clients may call
+EXPOSED = {"learn", "learn_many", "recall", "embed_query", "topic_for", "flush", "stats"}
+
+
+def _strip_vectors(results):
+    """Vectors are large and no client reads them"""
+    return [{k: v for k, v in r.items() if k != "vector"} for r in results]
+
+
+class BrainServer:
+    def __init__(self, brain=None):
+        from core.brain import Brain
+        self.brain = brain or Brain()
+
+    def _handle(self, conn):
+        try:
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except EOFError:
+                    break
+                if method == "hello":
+                    conn.send(("ok", {"has_model": self.brain.has_model}))
+                    continue
+                if method not in EXPOSED:
+                    conn.send(("error", f"Unknown method: {method}"))
+                    continue
+                try:
+                    result = getattr(self.brain, method)(*args, **kwargs)
+                    if method == "recall":
+                        result = _strip_vectors(result)
+                    conn.send(("ok", result))
+                except Exception as e:
+                    conn.send(("error", str(e)))
+        finally:
+            conn.close()
+
+    def serve_forever(self):
+        address = (BRAIN_SERVICE_HOST, BRAIN_SERVICE_PORT)
+        with Listener(address, authkey=load_authkey(BRAIN_SERVICE_KEY_FILE)) as listener:
+            print(f"🧠 Brain Service listening on {address[0]}:{address[1]}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"   ⚠️ Rejected client: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+
+class BrainClient:
+    """
+    Drop-in for Brain backed by the Brain Service.
+    Each thread gets its own connection, so orchestra agents don't queue
+    behind each other.
+    """
+    def __init__(self):
+        self._local = threading.local()
+        status = self._call("hello")
+        self.has_model = status["has_model"]
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client((BRAIN_SERVICE_HOST, BRAIN_SERVICE_PORT), authkey=load_authkey(BRAIN_SERVICE_KEY_FILE))
+            self._local.conn = conn
+        return conn
+
+    def _call(self, method, *args, **kwargs):
+        try:
+            conn = self._conn()
+            conn.send((method, args, kwargs))
+            status, result = conn.recv()
+        except (OSError, EOFError):
+            # Service restarted: reconnect once
+            self._local.conn = None
+            conn = self._conn()
+            conn.send((method, args, kwargs))
+            status, result = conn.recv()
+        if status == "error":
+            raise RuntimeError(result)
+        return result
+
+    def learn(self, text: str, source: str = "user"):
+        try:
+            return self._call("learn", text, source)
+        except Exception as e:
+            print(f"❌ Brain Service learn failed: {e}")
+            return 0
+
+    def learn_many(self, docs):
+        # Streamed texts can't be pickled: join them before sending
+        docs = [(d, "user") if isinstance(d, str) else d for d in docs]
+        docs = [(t if isinstance(t, str) else "".join(t), s) for t, s in docs]
+        try:
+            return self._call("learn_many", docs)
+        except Exception as e:
+            print(f"❌ Brain Service learn failed: {e}")
+            return 0
+
+    def recall(self, query: str, top_k=3, threshold=0.5, **kwargs):
+        try:
+            return self._call("recall", query, top_k, threshold, **kwargs)
+        except Exception:
+            return []
+
+    def embed_query(self, query: str):
+        return self._call("embed_query", query)
+
+    def topic_for(self, query: str, source_kind=None):
+        try:
+            return self._call("topic_for", query, source_kind)
+        except Exception:
+            return None
+
+    def flush(self, timeout=None):
+        return self._call("flush", timeout)
+
+    def stats(self):
+        return self._call("stats")
+
+
+def connect_brain():
+    """
+    Use the shared Brain Service when it is running,
+    otherwise open the table in this process.
+    """
+    try:
+        client = BrainClient()
+        print(f"🧠 Connected to Brain Service ({BRAIN_SERVICE_HOST}:{BRAIN_SERVICE_PORT}).")
+        return client
+    except Exception:
+        from core.brain import Brain
+        return Brain()
+
+
+if __name__ == "__main__":
+    BrainServer().serve_forever()
@@ -0,0 +1,160 @@
+"""
+JARVIS Chunking
+Turns a stream of text pieces into chunks for the Brain, lazily:
+a chunk is yielded as soon as it is complete, so a long document is never
+held in memory as a list of chunks.
+"""
+import re
+
+from config import CHUNKER, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_SENTENCES
+
+# A sentence ends at . ! ? (optionally a closing quote/bracket) followed by whitespace;
+# whitespace holding two line breaks ends a paragraph
+SENTENCE_MARKS = ".!?"
+CLOSERS = "\"')]"
+WHITESPACE = re.compile(r"\s+")
+TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text):
+    """Approximate token count: words and punctuation marks"""
+    return len(TOKEN.findall(text))
+
+
+def _as_pieces(text):
+    """Accept a whole string or any iterable of string pieces"""
+    return [text] if isinstance(text, str) else text
+
+
+def _ends_sentence(text, i):
+    """Does the whitespace at text[i] follow the end of a sentence?"""
+    if i > 0 and text[i - 1] in SENTENCE_MARKS:
+        return True
+    return i > 1 and text[i - 1] in CLOSERS and text[i - 2] in SENTENCE_MARKS
+
+
+def iter_sentences(text, max_tokens=None):
+    """
+    Yield (sentence, ends_paragraph) from a string or a stream of pieces.
+    Only the unfinished sentence is buffered, and each piece is scanned once.
+    Whitespace counts as a boundary only once text follows it (at the end of
+    a piece it may still grow into a paragraph break), so the output doesn't
+    depend on where the stream was split. With max_tokens, a sentence with
+    no end mark is cut at the last word boundary that keeps it within max_tokens.
+    """
+    buffer = ""
+    start = 0       # Where the unfinished sentence begins
+    word = 0        # Where the word after the last processed gap begins
+    scan = 0        # Where the search for the next gap resumes
+    tokens = 0      # Tokens in buffer[start:word]
+    gap = None      # Last gap inside the sentence: (start, end), a forced cut point
+    for piece in _as_pieces(text):
+        buffer += piece
+        for run in WHITESPACE.finditer(buffer, scan):
+            if run.end() == len(buffer):
+                scan = run.start()
+                break   # May continue (or become a paragraph break) in the next piece
+            word_tokens = count_tokens(buffer[word:run.start()])
+            if max_tokens and gap and tokens + word_tokens > max_tokens:
+                sentence = buffer[start:gap[0]].strip()
+                if sentence:
+                    yield sentence, False
+                start, tokens, gap = gap[1], 0, None
+            tokens += word_tokens
+            paragraph = run.group().count("\n") >= 2
+            if paragraph or _ends_sentence(buffer, run.start()):
+                sentence = buffer[start:run.start()].strip()
+                if sentence:
+                    yield sentence, paragraph
+                start, tokens, gap = run.end(), 0, None
+            else:
+                gap = run.span()
+            word = scan = run.end()
+        else:
+            scan = len(buffer)
+        # Drop what was yielded, so the buffer only holds the unfinished sentence
+        buffer = buffer[start:]
+        word, scan = word - start, scan - start
+        gap = (gap[0] - start, gap[1] - start) if gap else None
+        start = 0
+    if max_tokens and gap and tokens + count_tokens(buffer[word:]) > max_tokens:
+        sentence = buffer[:gap[0]].strip()
+        if sentence:
+            yield sentence, False
+        buffer = buffer[gap[1]:]
+    if buffer.strip():
+        yield buffer.strip(), True
+
+
+class SentenceChunker:
+    """
+    Packs whole sentences into chunks of at most max_tokens.
+    Consecutive chunks share overlap_sentences sentences of context; a
+    paragraph break closes a chunk once it is at least half full.
+    Sentences longer than max_tokens are split on word boundaries.
+    """
+    def __init__(self, max_tokens=CHUNK_MAX_TOKENS, overlap_sentences=CHUNK_OVERLAP_SENTENCES):
+        self.max_tokens = max_tokens
+        self.overlap_sentences = overlap_sentences
+
+    def _split_long(self, sentence):
+        words = sentence.split()
+        part, tokens = [], 0
+        for word in words:
+            t = count_tokens(word)
+            if part and tokens + t > self.max_tokens:
+                yield " ".join(part), tokens
+                part, tokens = [], 0
+            part.append(word)
+            tokens += t
+        if part:
+            yield " ".join(part), tokens
+
+    def __call__(self, text):
+        current = []   # [(sentence, tokens)]
+        size = 0
+        for sentence, ends_paragraph in iter_sentences(text, self.max_tokens):
+            tokens = count_tokens(sentence)
+            parts = self._split_long(sentence) if tokens > self.max_tokens else [(sentence, tokens)]
+            for part, part_tokens in parts:
+                if current and size + part_tokens > self.max_tokens:
+                    yield " ".join(s for s, _ in current)
+                    # Carry the last sentences over only if the new one still fits beside them
+                    keep = current[-self.overlap_sentences:] if self.overlap_sentences else []
+                    if sum(t for _, t in keep) + part_tokens > self.max_tokens:
+                        keep = []
+                    current, size = list(keep), sum(t for _, t in keep)
+                current.append((part, part_tokens))
+                size += part_tokens
+            if ends_paragraph and size >= self.max_tokens // 2:
+                yield " ".join(s for s, _ in current)
+                current, size = [], 0
+        if current:
+            yield " ".join(s for s, _ in current)
+
+
+class FixedChunker:
+    """Original chunking: 500-char windows every 400 chars"""
+    def __init__(self, size=500, step=400):
+        self.size = size
+        self.step = step
+
+    def __call__(self, text):
+        buffer = ""
+        for piece in _as_pieces(text):
+            buffer += piece
+            while len(buffer) >= self.size:
+                yield buffer[:self.size]
+                buffer = buffer[self.step:]
+        if buffer.strip():
+            yield buffer
+
+
+CHUNKERS = {
+    "sentence": SentenceChunker,
+    "fixed": FixedChunker,
+}
+
+
+def get_chunker(name=CHUNKER):
+    return CHUNKERS[name]()
@@ -0,0 +1,116 @@
+"""
+JARVIS Embedding Cache
+Content-addressed store of embeddings keyed by (model, sha256(text)).
+Hot tier in RAM, cold tier in SQLite on disk, both LRU-bounded.
+"""
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+
+
+class EmbeddingCache:
+    def __init__(self, path, max_entries=500_000, hot_entries=10_000):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.hot_entries = hot_entries
+        self.hot = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self.db.commit()
+
+    @staticmethod
+    def key(model, text):
+        return f"{model}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def _remember(self, key, vector):
+        """Put into the hot tier, dropping the least recently used entry"""
+        self.hot[key] = vector
+        self.hot.move_to_end(key)
+        while len(self.hot) > self.hot_entries:
+            self.hot.popitem(last=False)
+
+    def get_many(self, model, texts):
+        """Returns a list aligned with texts: vector or None on miss"""
+        keys = [self.key(model, t) for t in texts]
+        found = {}
+        with self._lock:
+            cold = []
+            for k in keys:
+                if k in self.hot:
+                    self.hot.move_to_end(k)
+                    found[k] = self.hot[k]
+                elif k not in found:
+                    cold.append(k)
+
+            # SQLite caps bound parameters, so look up in slices
+            now = time.time()
+            for i in range(0, len(cold), 500):
+                part = cold[i:i+500]
+                rows = self.db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                for k, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                    found[k] = vector
+                    self._remember(k, vector)
+                if rows:
+                    self.db.executemany("UPDATE embeddings SET last_used=? WHERE key=?", [(now, k) for k, _ in rows])
+            if cold:
+                self.db.commit()
+
+            result = [found.get(k) for k in keys]
+            hit_count = sum(v is not None for v in result)
+            self.hits += hit_count
+            self.misses += len(result) - hit_count
+        return result
+
+    def put_many(self, model, texts, vectors):
+        now = time.time()
+        rows = []
+        with self._lock:
+            for t, v in zip(texts, vectors):
+                k = self.key(model, t)
+                self._remember(k, v)
+                rows.append((k, np.asarray(v, dtype=np.float32).tobytes(), now))
+            self.db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self.db.commit()
+
+            # Amortized eviction: only check the size every few thousand puts
+            self._puts_since_evict += len(rows)
+            if self._puts_since_evict >= 1000:
+                self._puts_since_evict = 0
+                self._evict()
+
+    def _evict(self):
+        """Trim the disk tier back to max_entries, oldest last_used first"""
+        count = self.db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.db.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)", (excess,)
+            )
+            self.db.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "hot_entries": len(self.hot),
+        }
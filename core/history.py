@@ -0,0 +1,124 @@
+"""
+JARVIS Conversation History
+Keeps the chat prompt inside a token budget:
+- the current turn is sent in full; earlier turns lose their RAG context
+  ([VERIFIED KNOWLEDGE], [SCREEN VISUALS], ...) and keep only what was said
+- turns that no longer fit are folded into a rolling summary, computed in
+  a background thread so no turn waits for it
+- at most HISTORY_MAX_MESSAGES messages are held in memory
+"""
+import re
+import threading
+from collections import deque
+
+from config import HISTORY_TOKEN_BUDGET, HISTORY_MAX_MESSAGES, HISTORY_SUMMARY_TOKENS
+from core.chunking import count_tokens
+
+# jarvis.py / chatbot.py put the spoken text after this marker, context before it
+QUERY_MARKER = re.compile(r"(?:^|\n)USER(?: QUERY)?: ")
+
+
+def strip_context(message: str) -> str:
+    """'[VERIFIED KNOWLEDGE]: ...\\nUSER QUERY: hi' -> 'hi'"""
+    if not message.startswith(("[", "USER")):
+        return message
+    matches = list(QUERY_MARKER.finditer(message))
+    if not matches:
+        return message
+    return message[matches[-1].end():]
+
+
+class ConversationHistory:
+    """
+    summarize_fn(previous_summary, messages) -> new summary. Called off the
+    request path; when it fails, the evicted turns are simply dropped.
+    """
+    def __init__(self, summarize_fn=None, token_budget=HISTORY_TOKEN_BUDGET,
+                 max_messages=HISTORY_MAX_MESSAGES):
+        self.summarize_fn = summarize_fn
+        self.token_budget = token_budget
+        self.messages = deque()      # (message, tokens), context already stripped
+        self.max_messages = max_messages
+        self.summary = ""
+        self._evicted = []           # waiting for the summarizer
+        self._lock = threading.Lock()
+        self._summarizing = False
+
+    def __len__(self):
+        return len(self.messages)
+
+    def add(self, role, content):
+        """Record a finished message (user turns lose their RAG context here)"""
+        if role == "user":
+            content = strip_context(content)
+        with self._lock:
+            self.messages.append(({"role": role, "content": content}, count_tokens(content)))
+            while len(self.messages) > self.max_messages:
+                self._evicted.append(self.messages.popleft()[0])
+        self._summarize_later()
+
+    def build(self, system_prompt, user_message):
+        """
+        Messages for the next request: system prompt (+ summary), as many
+        recent turns as the budget allows, then the full current message.
+        Older turns that don't fit are handed to the summarizer.
+        """
+        system = system_prompt
+        if self.summary:
+            system += f"\n\n[EARLIER IN THIS CONVERSATION]: {self.summary}"
+        budget = self.token_budget - count_tokens(system) - count_tokens(user_message)
+
+        with self._lock:
+            kept = []
+            for i in range(len(self.messages) - 1, -1, -1):
+                message, tokens = self.messages[i]
+                if tokens > budget:
+                    # Everything older than this no longer fits either
+                    for _ in range(i + 1):
+                        self._evicted.append(self.messages.popleft()[0])
+                    break
+                budget -= tokens
+                kept.append(message)
+        self._summarize_later()
+
+        kept.reverse()
+        return [{"role": "system", "content": system}, *kept, {"role": "user", "content": user_message}]
+
+    def _summarize_later(self):
+        with self._lock:
+            if not self._evicted or self._summarizing:
+                return
+            if self.summarize_fn is None:
+                self._evicted.clear()
+                return
+            self._summarizing = True
+        threading.Thread(target=self._summarize, daemon=True, name="history-summary").start()
+
+    def _summarize(self):
+        try:
+            while True:
+                with self._lock:
+                    batch, self._evicted = self._evicted, []
+                if not batch:
+                    break
+                try:
+                    summary = self.summarize_fn(self.summary, batch).strip()
+                    # Never let the summary itself outgrow its share of the budget
+                    words = summary.split()
+                    while words and count_tokens(" ".join(words)) > HISTORY_SUMMARY_TOKENS:
+                        words = words[:int(len(words) * 0.9)]
+                    self.summary = " ".join(words)
+                except Exception as e:
+                    print(f"   ⚠️ History summary failed: {e}")
+        finally:
+            with self._lock:
+                self._summarizing = False
+            # Turns evicted after the last batch was taken
+            if self._evicted:
+                self._summarize_later()
+
+    def clear(self):
+        with self._lock:
+            self.messages.clear()
+            self._evicted = []
+            self.summary = ""
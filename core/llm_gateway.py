@@ -0,0 +1,407 @@
+"""
+JARVIS LLM Gateway
+Every Ollama call asks the gateway for a slot first:
+- priority classes: "interactive" (the user is waiting), "normal" (user
+  session housekeeping, e.g. the history summary) and "background"
+  (orchestra agents, autolearn)
+- at most LLM_CONCURRENCY[model] generations at once per model
+- background calls wait while the user is active (interactive call queued
+  or running, within LLM_INTERACTIVE_GRACE of the last one, or the
+  orchestra PAUSED by chatbot.py) and are rejected once
+  LLM_BACKGROUND_QUEUE of them are already waiting
+- an interactive call preempts running background calls: their streams are
+  closed, so Ollama stops generating, and chat() queues them again
+
+Run python -m core.llm_gateway to schedule across processes (jarvis.py,
+server.py, orchestra.py, autolearn.py); otherwise each process schedules
+its own calls.
+"""
+import json
+import time
+import itertools
+import threading
+import requests
+from contextlib import contextmanager
+from multiprocessing.connection import Listener, Client
+
+from config import (
+    OLLAMA_URL, OLLAMA_MODEL, LLM_GATEWAY_HOST, LLM_GATEWAY_PORT, LLM_GATEWAY_KEY_FILE,
+    LLM_CONCURRENCY, LLM_BACKGROUND_QUEUE, LLM_INTERACTIVE_GRACE, LLM_PREEMPT_RETRIES,
+)
+from core.authkey import load_authkey
+from core.coordination import get_orchestra_status
+from core.llm_tasks import route, record, can_fall_back, mark_missing
+
+INTERACTIVE, NORMAL, BACKGROUND = "interactive", "normal", "background"
+PRIORITIES = {INTERACTIVE: 0, NORMAL: 1, BACKGROUND: 2}
+
+
+class GatewayError(RuntimeError):
+    pass
+
+class Rejected(GatewayError):
+    """Admission control: too many background calls already waiting"""
+
+class Preempted(GatewayError):
+    """A background call was cancelled for interactive work too many times"""
+
+
+class _Lease:
+    """One queued or running call"""
+    def __init__(self, model, priority, seq, cancel=None):
+        self.model = model
+        self.priority = priority
+        self.rank = PRIORITIES[priority]
+        self.seq = seq
+        self.cancel = cancel
+        self.queued_at = time.time()
+        self.granted = False
+        self.preempted = False
+
+    def __lt__(self, other):
+        return (self.rank, self.seq) < (other.rank, other.seq)
+
+    def preempt(self):
+        self.preempted = True
+        if self.cancel is not None:
+            try:
+                self.cancel()
+            except Exception:
+                pass
+
+
+class LLMGateway:
+    """In-process scheduler; GatewayServer shares one between processes"""
+    def __init__(self, concurrency=LLM_CONCURRENCY, background_queue=LLM_BACKGROUND_QUEUE,
+                 grace=LLM_INTERACTIVE_GRACE):
+        self.concurrency = concurrency
+        self.background_queue = background_queue
+        self.grace = grace
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._running = set()
+        self._seq = itertools.count()
+        self.last_interactive = 0.0
+        self.preempted = 0
+        self.rejected = 0
+        self._granted = {p: 0 for p in PRIORITIES}
+        self._wait_total = {p: 0.0 for p in PRIORITIES}
+
+    def _limit(self, model):
+        return self.concurrency.get(model, self.concurrency.get("default", 1))
+
+    def _user_active(self):
+        if any(l.rank == 0 for l in self._waiting) or any(l.rank == 0 for l in self._running):
+            return True
+        if time.time() - self.last_interactive < self.grace:
+            return True
+        return get_orchestra_status() == "PAUSED"
+
+    def _dispatch(self):
+        """Grant slots in priority order (caller holds the lock)"""
+        user_active = None
+        blocked = set()   # Models with an earlier call still waiting
+        for lease in sorted(self._waiting):
+            if lease.model in blocked:
+                continue
+            if lease.priority == BACKGROUND:
+                if user_active is None:
+                    user_active = self._user_active()
+                if user_active:
+                    blocked.add(lease.model)
+                    continue
+            if sum(1 for l in self._running if l.model == lease.model) >= self._limit(lease.model):
+                blocked.add(lease.model)
+                continue
+            self._waiting.remove(lease)
+            self._running.add(lease)
+            lease.granted = True
+            self._granted[lease.priority] += 1
+            self._wait_total[lease.priority] += time.time() - lease.queued_at
+        self._cond.notify_all()
+
+    def acquire(self, model, priority=BACKGROUND, cancel=None):
+        """
+        Block until the call may run. cancel() is called (from another
+        thread) if a background call is preempted.
+        """
+        with self._cond:
+            if priority == BACKGROUND and sum(1 for l in self._waiting if l.priority == BACKGROUND) >= self.background_queue:
+                self.rejected += 1
+                raise Rejected(f"{self.background_queue} background LLM calls already waiting")
+            lease = _Lease(model, priority, next(self._seq), cancel)
+            self._waiting.append(lease)
+            if priority == INTERACTIVE:
+                self.last_interactive = time.time()
+                # One GPU: any running background generation slows the user down
+                for running in [l for l in self._running if l.priority == BACKGROUND and not l.preempted]:
+                    running.preempt()
+                    self.preempted += 1
+            try:
+                self._dispatch()
+                while not lease.granted:
+                    # Timed wait: the grace period and the PAUSED flag expire without a notify
+                    self._cond.wait(0.5)
+                    self._dispatch()
+            except BaseException:
+                if lease in self._waiting:
+                    self._waiting.remove(lease)
+                elif lease.granted:
+                    self._running.discard(lease)
+                self._dispatch()
+                raise
+            return lease
+
+    def release(self, lease):
+        with self._cond:
+            self._running.discard(lease)
+            if lease.priority == INTERACTIVE:
+                self.last_interactive = time.time()
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, model, priority=BACKGROUND, cancel=None):
+        lease = self.acquire(model, priority, cancel)
+        try:
+            yield lease
+        finally:
+            self.release(lease)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "running": {p: sum(1 for l in self._running if l.priority == p) for p in PRIORITIES},
+                "waiting": {p: sum(1 for l in self._waiting if l.priority == p) for p in PRIORITIES},
+                "granted": dict(self._granted),
+                "avg_wait_ms": {
+                    p: round(self._wait_total[p] / self._granted[p] * 1000, 1) if self._granted[p] else 0.0
+                    for p in PRIORITIES
+                },
+                "preempted": self.preempted,
+                "rejected": self.rejected,
+            }
+
+
+class GatewayServer:
+    """
+    One connection per call: ("acquire", (model, priority)) -> "granted",
+    then "preempt" may arrive until the client sends "release".
+    A client that disappears releases its slot.
+    """
+    def __init__(self, gateway=None):
+        self.gateway = gateway or LLMGateway()
+
+    def _handle(self, conn):
+        lease = None
+        send_lock = threading.Lock()
+
+        def send(message):
+            with send_lock:
+                try:
+                    conn.send(message)
+                except OSError:
+                    pass
+
+        try:
+            method, args = conn.recv()
+            if method == "stats":
+                send(("ok", self.gateway.stats()))
+                return
+            if method != "acquire":
+                send(("error", f"Unknown method: {method}"))
+                return
+            model, priority = args
+            try:
+                lease = self.gateway.acquire(model, priority, cancel=lambda: send(("preempt", None)))
+            except Rejected as e:
+                send(("rejected", str(e)))
+                return
+            send(("granted", None))
+            try:
+                conn.recv()   # "release"
+            except (EOFError, OSError):
+                pass
+        except (EOFError, OSError):
+            pass
+        finally:
+            if lease is not None:
+                self.gateway.release(lease)
+                send(("released", None))
+            conn.close()
+
+    def serve_forever(self):
+        address = (LLM_GATEWAY_HOST, LLM_GATEWAY_PORT)
+        with Listener(address, authkey=load_authkey(LLM_GATEWAY_KEY_FILE)) as listener:
+            print(f"🚦 LLM Gateway listening on {address[0]}:{address[1]}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"   ⚠️ Rejected client: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+
+class GatewayClient:
+    """Same slot() as LLMGateway, scheduled by the gateway service"""
+    def __init__(self):
+        self.stats()
+        # Used if the service goes away mid-run
+        self._fallback = None
+
+    def _connect(self):
+        return Client((LLM_GATEWAY_HOST, LLM_GATEWAY_PORT), authkey=load_authkey(LLM_GATEWAY_KEY_FILE))
+
+    def stats(self):
+        with self._connect() as conn:
+            conn.send(("stats", ()))
+            return conn.recv()[1]
+
+    @contextmanager
+    def slot(self, model, priority=BACKGROUND, cancel=None):
+        try:
+            conn = self._connect()
+        except OSError:
+            if self._fallback is None:
+                print("   ⚠️ LLM Gateway unreachable, scheduling calls in this process.")
+                self._fallback = LLMGateway()
+            with self._fallback.slot(model, priority, cancel) as lease:
+                yield lease
+            return
+
+        with conn:
+            conn.send(("acquire", (model, priority)))
+            status, detail = conn.recv()
+            if status == "rejected":
+                raise Rejected(detail)
+            if status != "granted":
+                raise GatewayError(detail)
+            lease = _Lease(model, priority, 0, cancel)
+
+            def watch():
+                try:
+                    while conn.recv()[0] != "released":
+                        lease.preempt()
+                except (EOFError, OSError):
+                    pass
+
+            watcher = threading.Thread(target=watch, daemon=True, name="llm-lease")
+            watcher.start()
+            try:
+                yield lease
+            finally:
+                try:
+                    conn.send(("release", None))
+                except OSError:
+                    pass
+                watcher.join(timeout=5)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+def get_gateway():
+    """The gateway service when it is running, otherwise a scheduler for this process"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            try:
+                _gateway = GatewayClient()
+                print(f"🚦 Connected to LLM Gateway ({LLM_GATEWAY_HOST}:{LLM_GATEWAY_PORT}).")
+            except Exception:
+                _gateway = LLMGateway()
+        return _gateway
+
+
+def _generate(model, messages, options, stream):
+    """
+    One streamed /api/chat call collected into a string.
+    (text, final chunk with Ollama's token counts), or (None, None) if it was cut off.
+    """
+    from core.llm_stream import SESSION, TIMEOUT
+
+    body = {"model": model, "messages": messages, "stream": True}
+    if options:
+        body["options"] = options
+    parts = []
+    with SESSION.post(f"{OLLAMA_URL}/api/chat", json=body, stream=True, timeout=TIMEOUT) as response:
+        stream.attach(response)
+        try:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    data = json.loads(line)
+                    parts.append(data.get("message", {}).get("content", ""))
+                    if data.get("done"):
+                        return "".join(parts), data
+        finally:
+            stream.detach()
+    return None, None
+
+
+def _chat(model, messages, priority, options, retries):
+    """
+    chat() plus what the call cost: seconds generating, seconds queued for
+    the attempt that finished, seconds spent on attempts that were preempted, tokens
+    """
+    from core.llm_stream import _Stream
+
+    gateway = get_gateway()
+    preempted = 0.0
+    for _ in range(retries + 1):
+        stream = _Stream()
+        text = None
+        queued = time.time()
+        with gateway.slot(model, priority, cancel=stream.cancel) as lease:
+            started = time.time()
+            try:
+                text, final = _generate(model, messages, options, stream)
+            except Exception:
+                if not lease.preempted:
+                    raise
+            finished = time.time()
+        # A reply that finished just before the preempt is still good
+        if text is not None:
+            return text, {
+                "seconds": finished - started,
+                "wait": started - queued,
+                "preempted": preempted,
+                "prompt_tokens": final.get("prompt_eval_count"),
+                "output_tokens": final.get("eval_count"),
+            }
+        if not lease.preempted:
+            raise GatewayError("Ollama closed the stream before the reply was complete")
+        preempted += finished - queued
+    raise Preempted(f"{model} call preempted {retries + 1} times")
+
+
+def chat(model, messages, priority=BACKGROUND, options=None, retries=LLM_PREEMPT_RETRIES):
+    """
+    Non-streaming chat through the gateway; returns the reply text.
+    A preempted call is queued again (behind the work that preempted it)
+    up to `retries` times, then Preempted is raised.
+    """
+    return _chat(model, messages, priority, options, retries)[0]
+
+
+def ask(task, messages, priority=BACKGROUND, retries=LLM_PREEMPT_RETRIES):
+    """
+    chat() for a task: LLM_TASKS picks the model and options, and the
+    call's latency and token counts go to the task log.
+    """
+    model, options = route(task)
+    try:
+        text, cost = _chat(model, messages, priority, options, retries)
+    except requests.exceptions.HTTPError as e:
+        # 404: the small model was never pulled
+        if e.response is None or e.response.status_code != 404 or not can_fall_back(model):
+            raise
+        mark_missing(model)
+        model = OLLAMA_MODEL
+        text, cost = _chat(model, messages, priority, options, retries)
+    record(task, model, **cost)
+    return text
+
+
+if __name__ == "__main__":
+    GatewayServer().serve_forever()
@@ -3,17 +3,137 @@ JARVIS LLM Integration using Ollama
 Streaming responses for low latency
 """
 import json
+import time
+import socket
+import asyncio
+import threading
 import requests
-from typing import Generator
+from requests.adapters import HTTPAdapter
+from typing import Generator, AsyncGenerator
 
-from config import OLLAMA_URL, OLLAMA_MODEL, SYSTEM_PROMPT
+from config import (
+    OLLAMA_URL, SYSTEM_PROMPT,
+    LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT, LLM_POOL_SIZE,
+    LLM_HEALTH_COOLDOWN, LLM_HEALTH_MAX_COOLDOWN, HISTORY_SUMMARY_TOKENS,
+)
+from core.history import ConversationHistory
+from core.llm_gateway import get_gateway, ask, INTERACTIVE, NORMAL
+from core.llm_tasks import route, record
+
+TIMEOUT = (LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT)
+
+
+def _make_session():
+    """Keep-alive connections to Ollama: no TCP setup per turn"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=LLM_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# One pool per process, shared by every StreamingLLM
+SESSION = _make_session()
+
+
+class OllamaHealth:
+    """
+    Circuit breaker for the Ollama server.
+    Closed (normal): requests go straight through, nothing is probed.
+    Open: after a connection failure, calls fail fast for a cooldown.
+    Then one caller probes /api/tags; success closes the circuit, failure
+    re-opens it with a doubled cooldown.
+    """
+    def __init__(self, cooldown=LLM_HEALTH_COOLDOWN, max_cooldown=LLM_HEALTH_MAX_COOLDOWN):
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.open_until = 0.0
+        self.failed = False
+        self._lock = threading.Lock()
+
+    def _probe(self):
+        try:
+            return SESSION.get(f"{OLLAMA_URL}/api/tags", timeout=(LLM_CONNECT_TIMEOUT, 2)).status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+    def available(self) -> bool:
+        if not self.failed:
+            return True
+        with self._lock:
+            if not self.failed:
+                return True
+            if time.time() < self.open_until:
+                return False
+            if self._probe():
+                self.record_success()
+                return True
+            self.record_failure()
+            return False
+
+    def record_success(self):
+        self.failed = False
+        self.cooldown = self.base_cooldown
+
+    def record_failure(self):
+        if self.failed:
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+        self.failed = True
+        self.open_until = time.time() + self.cooldown
+
+HEALTH = OllamaHealth()
+
+
+# Reader thread -> event loop markers
+_END = object()
+
+class _Failure:
+    def __init__(self, message):
+        self.message = message
+
+
+class _Stream:
+    """One in-flight /api/chat response that another thread may cancel"""
+    def __init__(self):
+        self.response = None
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def attach(self, response):
+        with self._lock:
+            self.response = response
+            if self.cancelled:
+                self._abort()
+
+    def detach(self):
+        with self._lock:
+            self.response = None
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            if self.response is not None:
+                self._abort()
+
+    def _abort(self):
+        # shutdown() wakes the reader blocked in recv() right away (close() alone
+        # waits for the next chunk) and tells Ollama the client is gone
+        try:
+            self.response.raw._connection.sock.shutdown(socket.SHUT_RDWR)
+        except Exception:
+            pass
+        self.response.close()
 
 
 class StreamingLLM:
     """Connect to Ollama with streaming responses"""
     
     def __init__(self):
-        self.conversation_history = []
+        # Token-budgeted, with a background summary of older turns
+        self.history = ConversationHistory(self._summarize)
+        self._streams = set()
         # Base prompt will be formatted later
         self.base_system_prompt = SYSTEM_PROMPT
         self.system_prompt = self.base_system_prompt.replace("{memory_context}", "")
@@ -29,13 +149,26 @@ class StreamingLLM:
         self.system_prompt = self.base_system_prompt.replace("{memory_context}", "")
         print("   🔄 System Persona Switched.")
         
+    @property
+    def conversation_history(self):
+        """Turns currently kept verbatim (RAG context stripped from user turns)"""
+        return [m for m, _ in self.history.messages]
+
+    def _summarize(self, summary, messages):
+        """Fold evicted turns into the rolling summary (runs in the history thread)"""
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        prompt = (
+            f"Summary of the conversation so far: {summary or '(none)'}\n\n"
+            f"Newer turns:\n{transcript}\n\n"
+            f"Rewrite the summary to include the newer turns in under {HISTORY_SUMMARY_TOKENS // 2} words. "
+            "Keep names, facts, decisions and open questions. Reply with the summary only."
+        )
+        # Queued behind the user's own turns, ahead of background work
+        return ask("summary", [{"role": "user", "content": prompt}], priority=NORMAL)
+
     def _check_ollama(self) -> bool:
-        """Check if Ollama is running"""
-        try:
-            response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=2)
-            return response.status_code == 200
-        except:
-            return False
+        """Check if Ollama is running (cached: only probes after a failure)"""
+        return HEALTH.available()
     
     def chat(self, user_message: str) -> str:
         """
@@ -47,65 +180,141 @@ class StreamingLLM:
             response_text += chunk
         return response_text
     
-    def chat_stream(self, user_message: str) -> Generator[str, None, None]:
+    def _failure_message(self, error) -> str:
+        if isinstance(error, requests.exceptions.ConnectionError):
+            HEALTH.record_failure()
+            return "I can't connect to Ollama. Make sure it's running with: ollama serve"
+        if isinstance(error, requests.exceptions.Timeout):
+            return "Sorry, I took too long to think. Can you try again?"
+        return f"Hmm, something went wrong: {str(error)}"
+
+    def _produce(self, messages, stream, put):
+        """Reader thread: POST /api/chat and hand each chunk to the event loop"""
+        model, options = route("chat")
+        options["stop"] = ["User:", "Sir:", "[USER]", "[user]"]
+        queued = time.time()
+        try:
+            # Interactive: jumps the gateway queue and preempts background generations
+            with get_gateway().slot(model, INTERACTIVE):
+                started = time.time()
+                first_token = None
+                # Pooled connection, released when the stream ends
+                with SESSION.post(
+                    f"{OLLAMA_URL}/api/chat",
+                    json={
+                        "model": model,
+                        "messages": messages,
+                        "stream": True,
+                        "options": options
+                    },
+                    stream=True,
+                    timeout=TIMEOUT
+                ) as response:
+                    stream.attach(response)
+                    try:
+                        HEALTH.record_success()
+                        for line in response.iter_lines():
+                            if line:
+                                data = json.loads(line)
+                                if "message" in data and "content" in data["message"]:
+                                    if first_token is None:
+                                        first_token = time.time() - started
+                                    put(data["message"]["content"])
+                                if data.get("done"):
+                                    record("chat", model, time.time() - started, data.get("prompt_eval_count"),
+                                           data.get("eval_count"), wait=started - queued, first_token=first_token)
+                    finally:
+                        # From here on the connection goes back to the pool: hands off
+                        stream.detach()
+        except Exception as e:
+            if not stream.cancelled:
+                put(_Failure(self._failure_message(e)))
+        finally:
+            put(_END)
+
+    async def achat_stream(self, user_message: str) -> AsyncGenerator[str, None]:
         """
-        Send message and stream response token by token.
-        Perfect for low-latency TTS integration.
+        Async chat_stream. Cancelling the consuming task, calling aclose() or
+        calling cancel() closes the HTTP stream at once: Ollama sees the
+        disconnect and stops generating, so the model is free for the next turn.
+        An interrupted turn is kept in history with whatever was generated.
         """
         if not self._check_ollama():
             yield "I can't connect to Ollama. Make sure it's running with: ollama serve"
             return
         
-        # Add user message to history
-        self.conversation_history.append({
-            "role": "user",
-            "content": user_message
-        })
+        # Build messages for API: as much recent history as the token budget allows
+        messages = self.history.build(self.system_prompt, user_message)
         
-        # Build messages for API
-        messages = [{"role": "system", "content": self.system_prompt}]
-        messages.extend(self.conversation_history[-10:])  # Keep last 10 messages
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                pass  # The consumer is gone and so is its loop (sync wrapper closed)
+        stream = _Stream()
+        self._streams.add(stream)
+        threading.Thread(target=self._produce, args=(messages, stream, put), daemon=True, name="llm-stream").start()
         
-        # Stream from Ollama
+        full_response = ""
+        failed = False
         try:
-            response = requests.post(
-                f"{OLLAMA_URL}/api/chat",
-                json={
-                    "model": OLLAMA_MODEL,
-                    "messages": messages,
-                    "stream": True,
-                    "options": {
-                        "stop": ["User:", "Sir:", "[USER]", "[user]"]
-                    }
-                },
-                stream=True,
-                timeout=60
-            )
-            
-            full_response = ""
-            
-            for line in response.iter_lines():
-                if line:
-                    data = json.loads(line)
-                    if "message" in data and "content" in data["message"]:
-                        chunk = data["message"]["content"]
-                        full_response += chunk
-                        yield chunk
-            
-            # Add assistant response to history
-            self.conversation_history.append({
-                "role": "assistant", 
-                "content": full_response
-            })
-            
-        except requests.exceptions.Timeout:
-            yield "Sorry, I took too long to think. Can you try again?"
-        except Exception as e:
-            yield f"Hmm, something went wrong: {str(e)}"
+            while True:
+                item = await queue.get()
+                if item is _END:
+                    break
+                if isinstance(item, _Failure):
+                    failed = True
+                    yield item.message
+                    break
+                full_response += item
+                yield item
+        finally:
+            # No-op when the stream already ended; otherwise this is the barge-in path
+            stream.cancel()
+            self._streams.discard(stream)
+            if not failed and full_response:
+                self.history.add("user", user_message)
+                self.history.add("assistant", full_response)
+
+    def chat_stream(self, user_message: str) -> Generator[str, None, None]:
+        """
+        Send message and stream response token by token.
+        Perfect for low-latency TTS integration.
+        Sync wrapper over achat_stream: closing this generator early (or
+        calling cancel() from another thread) stops generation upstream.
+        """
+        loop = asyncio.new_event_loop()
+        chunks = self.achat_stream(user_message)
+        step = None
+        try:
+            while True:
+                step = loop.create_task(chunks.__anext__())
+                try:
+                    chunk = loop.run_until_complete(step)
+                except StopAsyncIteration:
+                    break
+                yield chunk
+        finally:
+            # Ctrl+C lands inside run_until_complete with the generator still
+            # suspended in __anext__, where aclose() can't reach it. Cancelling
+            # that step runs achat_stream's finally: this turn's HTTP stream is
+            # aborted and the partial reply recorded (other turns are untouched)
+            if step is not None:
+                step.cancel()
+                loop.run_until_complete(asyncio.gather(step, return_exceptions=True))
+            loop.run_until_complete(chunks.aclose())
+            loop.close()
+
+    def cancel(self):
+        """Stop every generation in flight (safe to call from any thread, e.g. on barge-in)"""
+        for stream in list(self._streams):
+            stream.cancel()
     
     def clear_history(self):
         """Clear conversation history"""
-        self.conversation_history = []
+        self.history.clear()
         print("Conversation history cleared.")
 
 
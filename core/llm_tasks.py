@@ -0,0 +1,90 @@
+"""
+JARVIS LLM Task Routing
+Every LLM call names its task ("relevance", "synthesis", ...) and
+LLM_TASKS in config.py picks the model and options for it. Each call is
+logged with its latency and token counts, so llm_task_report.py can show
+whether a task's model keeps to its latency budget.
+"""
+import os
+import json
+import time
+import threading
+from pathlib import Path
+
+from config import OLLAMA_MODEL, LLM_SMALL_MODEL, LLM_TASKS
+
+CALL_LOG = Path(__file__).parent.parent / "brain_data" / "llm_calls.jsonl"
+# Past this size the log is rotated to llm_calls.jsonl.1 (one old file kept)
+CALL_LOG_MAX_BYTES = 20_000_000
+DEFAULT_TASK = {"model": OLLAMA_MODEL, "budget": None}
+
+_lock = threading.Lock()
+# Small model not pulled: its tasks run on OLLAMA_MODEL instead
+_missing = set()
+
+
+def task_spec(task):
+    return LLM_TASKS.get(task, DEFAULT_TASK)
+
+def route(task):
+    """(model, options) for a task"""
+    spec = task_spec(task)
+    model = OLLAMA_MODEL if spec["model"] in _missing else spec["model"]
+    return model, dict(spec.get("options") or {})
+
+def can_fall_back(model):
+    """Only the small tier falls back: a missing vision model has no text-only stand-in"""
+    return model == LLM_SMALL_MODEL and model != OLLAMA_MODEL
+
+def mark_missing(model):
+    if model not in _missing:
+        _missing.add(model)
+        print(f"   ⚠️ Model '{model}' is not installed (ollama pull {model}). Using {OLLAMA_MODEL} instead.")
+
+
+def record(task, model, seconds, prompt_tokens=None, output_tokens=None, wait=None, first_token=None,
+           preempted=None):
+    """
+    Append one call to the log (never fails the call). wait is the queue time
+    of the attempt that finished; preempted the time lost to earlier attempts.
+    """
+    budget = task_spec(task).get("budget")
+    entry = {
+        "at": round(time.time(), 3),
+        "task": task,
+        "model": model,
+        "seconds": round(seconds, 3),
+        "wait": round(wait, 3) if wait is not None else None,
+        "first_token": round(first_token, 3) if first_token is not None else None,
+        "preempted": round(preempted, 3) if preempted is not None else None,
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": output_tokens,
+        "budget": budget,
+        "over_budget": budget is not None and seconds > budget,
+    }
+    try:
+        with _lock:
+            CALL_LOG.parent.mkdir(exist_ok=True)
+            if CALL_LOG.exists() and CALL_LOG.stat().st_size > CALL_LOG_MAX_BYTES:
+                os.replace(CALL_LOG, CALL_LOG.with_suffix(".jsonl.1"))
+            with open(CALL_LOG, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+    except Exception:
+        pass
+
+
+def load_calls(path=CALL_LOG, since=None):
+    """Logged calls (optionally only those after the `since` timestamp)"""
+    calls = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    call = json.loads(line)
+                except ValueError:
+                    continue
+                if since is None or call["at"] >= since:
+                    calls.append(call)
+    except FileNotFoundError:
+        pass
+    return calls
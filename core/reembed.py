@@ -0,0 +1,184 @@
+"""
+JARVIS Re-Embed Migration
+Moves the knowledge base to a new embedding model or backend (EMBED_BACKEND),
+dimension or vector storage format (VECTOR_DIM / VECTOR_DTYPE).
+Streams the active table in batches, embeds them with the new model, writes
+a new versioned table (knowledge_v2, knowledge_v3, ...) and then atomically
+points every Brain at it. Progress is checkpointed after each batch, so a
+crash resumes where it stopped.
+
+Run with: python -m core.reembed <new_model> [batch_rows]
+"""
+import sys
+import json
+import time
+import lancedb
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from config import EMBED_BACKEND, EMBED_BATCH_SIZE, EMBED_MAX_INFLIGHT, WRITE_FLUSH_SECONDS, VECTOR_DIM, VECTOR_DTYPE
+from core.brain import (
+    BRAIN_DIR, DB_PATH, load_active_table, save_active_table,
+    embed_texts, ensure_schema, stored_hashes, vectors_normalized,
+    table_schema, table_storage, compact_vector,
+)
+
+CHECKPOINT_FILE = BRAIN_DIR / "reembed_checkpoint.json"
+COPY_COLUMNS = ["text", "source", "timestamp", "content_hash", "source_kind", "topic"]
+
+# Rows can wait in a Brain's write-behind queue before they are committed,
+# so the catch-up pass looks a little further back than the snapshot
+CATCH_UP_MARGIN = timedelta(minutes=5)
+
+
+def _load_checkpoint():
+    try:
+        with open(CHECKPOINT_FILE, 'r') as f:
+            return json.load(f)
+    except:
+        return None
+
+def _save_checkpoint(state):
+    tmp = CHECKPOINT_FILE.with_suffix(".tmp")
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    tmp.replace(CHECKPOINT_FILE)
+
+def _next_table_name(db, current):
+    """knowledge -> knowledge_v2 -> knowledge_v3 ... (skipping names in use)"""
+    base, _, n = current.partition("_v")
+    n = (int(n) if n.isdigit() else 1) + 1
+    names = db.table_names()
+    while f"{base}_v{n}" in names:
+        n += 1
+    return f"{base}_v{n}"
+
+
+class ReEmbedJob:
+    def __init__(self, new_model, batch_rows=1024):
+        self.new_model = new_model
+        self.batch_rows = batch_rows
+        self.db = lancedb.connect(str(DB_PATH))
+        self.pool = ThreadPoolExecutor(max_workers=EMBED_MAX_INFLIGHT, thread_name_prefix="reembed")
+        self.target = None
+
+    def _embed(self, texts):
+        batches = [texts[i:i+EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+        vectors = []
+        for batch_vectors in self.pool.map(lambda b: embed_texts(self.new_model, b), batches):
+            vectors.extend(batch_vectors)
+        return vectors
+
+    def _copy(self, rows, target_name, dedup=False):
+        """Embed rows with the new model and append them to the target table"""
+        if dedup and self.target is not None:
+            known = stored_hashes(self.target, [r["content_hash"] for r in rows])
+            rows = [r for r in rows if r["content_hash"] not in known]
+        if not rows:
+            return 0
+        vectors = self._embed([r["text"] for r in rows])
+        for r, v in zip(rows, vectors):
+            r["vector"] = compact_vector(v, VECTOR_DIM)
+        if self.target is None:
+            schema = table_schema(len(rows[0]["vector"]), VECTOR_DTYPE)
+            self.target = self.db.create_table(target_name, rows, schema=schema)
+        else:
+            self.target.add(rows)
+        return len(rows)
+
+    def _up_to_date(self, active):
+        """Same backend and model, already stored with the configured VECTOR_DIM / VECTOR_DTYPE"""
+        if (active["embed_backend"], active["embed_model"]) != (EMBED_BACKEND, self.new_model):
+            return False
+        if active["table"] not in self.db.table_names():
+            return False
+        table = self.db.open_table(active["table"])
+        dim, dtype = table_storage(table)
+        full_dim = len(embed_texts(self.new_model, ["dimension_check"])[0])
+        # Legacy unnormalized vectors need a pass even with the same model
+        return dtype == VECTOR_DTYPE and dim == min(VECTOR_DIM or full_dim, full_dim) and vectors_normalized(table)
+
+    def run(self):
+        active = load_active_table()
+        if self._up_to_date(active):
+            print(f"✅ '{active['table']}' already uses {self.new_model} ({VECTOR_DTYPE}, dim {VECTOR_DIM or 'full'}).")
+            return
+
+        state = _load_checkpoint()
+        if state and state["model"] == self.new_model and state["source"] == active["table"] \
+                and state.get("backend", "ollama") == EMBED_BACKEND:
+            print(f"♻️ Resuming re-embed into '{state['target']}' at row {state['rows_done']}...")
+        else:
+            source = self.db.open_table(active["table"])
+            ensure_schema(source)
+            state = {
+                "source": active["table"],
+                # Copy from a frozen version: row order stays stable across resumes
+                "source_version": source.version,
+                "target": _next_table_name(self.db, active["table"]),
+                "model": self.new_model,
+                "backend": EMBED_BACKEND,
+                "rows_done": 0,
+                "started_at": datetime.now().isoformat(),
+            }
+            _save_checkpoint(state)
+            print(f"🔁 Re-embedding '{state['source']}' -> '{state['target']}' with {EMBED_BACKEND}/{self.new_model}...")
+
+        if state["target"] in self.db.table_names():
+            self.target = self.db.open_table(state["target"])
+
+        snapshot = self.db.open_table(state["source"])
+        snapshot.checkout(state["source_version"])
+        total = snapshot.count_rows()
+        start = time.time()
+        resumed_at = state["rows_done"]
+
+        # 1. Bulk pass over the snapshot, one checkpoint per batch
+        reader = snapshot.search().select(COPY_COLUMNS).offset(state["rows_done"]).to_batches(self.batch_rows)
+        for batch in reader:
+            rows = batch.to_pylist()
+            # A crash between append and checkpoint would repeat the first batch
+            self._copy(rows, state["target"], dedup=state["rows_done"] == resumed_at)
+            state["rows_done"] += len(rows)
+            _save_checkpoint(state)
+            rate = (state["rows_done"] - resumed_at) / max(time.time() - start, 1e-6)
+            print(f"   {state['rows_done']}/{total} rows ({rate:.0f} rows/sec)")
+
+        # 2. Catch up on rows learned into the live table since the snapshot
+        since = (datetime.fromisoformat(state["started_at"]) - CATCH_UP_MARGIN).isoformat()
+        while self._catch_up(state, since):
+            time.sleep(WRITE_FLUSH_SECONDS)
+
+        if self.target is None:
+            print("⚠️ Source table is empty, nothing to migrate.")
+            CHECKPOINT_FILE.unlink()
+            return
+
+        # 3. Indexes, then the atomic switch
+        ensure_schema(self.target)
+        save_active_table(state["target"], self.new_model)
+
+        # 4. Running Brains switch on their next write or recall, but a batch
+        #    already being written still lands in the old table: copy until it stops growing
+        quiet = 0
+        while quiet < 2:
+            time.sleep(WRITE_FLUSH_SECONDS)
+            quiet = 0 if self._catch_up(state, since) else quiet + 1
+        CHECKPOINT_FILE.unlink()
+        print(f"✅ Brain now uses '{state['target']}' ({self.new_model}). Old table '{state['source']}' kept.")
+
+    def _catch_up(self, state, since):
+        """Copy rows learned into the source table since the migration started. Returns rows copied."""
+        live = self.db.open_table(state["source"])
+        late = live.search().where(f"timestamp >= '{since}'").select(COPY_COLUMNS).to_batches(self.batch_rows)
+        copied = sum(self._copy(batch.to_pylist(), state["target"], dedup=True) for batch in late)
+        if copied:
+            print(f"   Caught up {copied} rows learned during the migration.")
+        return copied
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m core.reembed <new_model> [batch_rows]")
+        sys.exit(1)
+    ReEmbedJob(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 1024).run()
@@ -0,0 +1,99 @@
+"""
+JARVIS Semantic Response Cache
+Answers to API questions, reused when the same or a near-identical question
+comes in again with the same persona and the same recalled memories.
+A repeat costs a lookup instead of a full generation: questions are
+embedded as recall() embeds them, so the vector comes from the Brain's
+embedding cache.
+"""
+import re
+import time
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+
+from config import RESPONSE_CACHE_SIMILARITY, RESPONSE_CACHE_TTL, RESPONSE_CACHE_SIZE
+
+
+def normalize(text):
+    """Case, whitespace and trailing punctuation don't change the question"""
+    return re.sub(r"\s+", " ", text).strip().lower().rstrip("?!. ")
+
+
+def context_fingerprint(persona, memories):
+    """Same persona + same recalled rows = same prompt apart from the question"""
+    ids = sorted(m.get("content_hash") or m["text"] for m in memories)
+    return hashlib.sha256("\n".join([persona, *ids]).encode("utf-8")).hexdigest()
+
+
+class SemanticResponseCache:
+    """
+    embed_fn(text) -> unit vector (called with the question as asked, not
+    its normalized key). Entries expire after ttl seconds; past max_entries
+    the least recently used go first.
+    """
+    def __init__(self, embed_fn, threshold=RESPONSE_CACHE_SIMILARITY,
+                 ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_SIZE):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # (fingerprint, normalized) -> [vector, answer, created]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _expire(self, now):
+        for key in [k for k, e in self._entries.items() if now - e[2] > self.ttl]:
+            del self._entries[key]
+
+    def get(self, question, fingerprint):
+        """(answer, ticket) on a hit, (None, ticket) on a miss; hand the ticket to put()"""
+        now = time.time()
+        exact = (fingerprint, normalize(question))
+        with self._lock:
+            self._expire(now)
+            if exact in self._entries:
+                self._entries.move_to_end(exact)
+                self.hits += 1
+                return self._entries[exact][1], (exact, question, None)
+            candidates = [(k, e[0]) for k, e in self._entries.items() if k[0] == fingerprint]
+        if not candidates:
+            with self._lock:
+                self.misses += 1
+            return None, (exact, question, None)
+
+        vector = np.asarray(self.embed_fn(question), dtype=np.float32)
+        sims = np.stack([v for _, v in candidates]) @ vector
+        best = int(np.argmax(sims))
+        key = candidates[best][0]
+        with self._lock:
+            if sims[best] >= self.threshold and key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.semantic_hits += 1
+                return self._entries[key][1], (exact, question, vector)
+            self.misses += 1
+        return None, (exact, question, vector)
+
+    def put(self, ticket, answer):
+        key, question, vector = ticket
+        if vector is None:
+            vector = np.asarray(self.embed_fn(question), dtype=np.float32)
+        with self._lock:
+            self._entries[key] = [vector, answer, time.time()]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,110 @@
+"""
+JARVIS Retention
+Decides what leaves the brain: per-source TTLs and a row budget, evicting
+the least recently recalled rows first. Recall hits are counted in memory
+and saved to a small SQLite file, never written into the knowledge table.
+"""
+import sqlite3
+import threading
+import numpy as np
+from datetime import datetime, timedelta
+
+from config import RETENTION_TTL_DAYS, RETENTION_PROTECTED, MAX_ROWS
+
+# Rows deleted per delete() commit
+DELETE_BATCH = 2000
+
+
+class UsageTracker:
+    """Last time each row (by content_hash) was returned by recall"""
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS usage ("
+            "content_hash TEXT PRIMARY KEY, last_recalled TEXT NOT NULL, hits INTEGER NOT NULL)"
+        )
+        self.db.commit()
+
+    def touch(self, hashes):
+        """Cheap: a dict update per recall; saved on the next save()"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            for h in hashes:
+                self._pending[h] = (now, self._pending.get(h, (now, 0))[1] + 1)
+
+    def save(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            self.db.executemany(
+                "INSERT INTO usage VALUES (?, ?, ?) ON CONFLICT(content_hash) DO UPDATE SET "
+                "last_recalled=excluded.last_recalled, hits=hits+excluded.hits",
+                [(h, t, n) for h, (t, n) in pending.items()]
+            )
+            self.db.commit()
+
+    def last_recalled(self):
+        """{content_hash: ISO timestamp} for every row ever recalled"""
+        with self._lock:
+            return dict(self.db.execute("SELECT content_hash, last_recalled FROM usage"))
+
+    def forget(self, hashes):
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                part = hashes[i:i+500]
+                self.db.execute(f"DELETE FROM usage WHERE content_hash IN ({','.join('?' * len(part))})", part)
+            self.db.commit()
+
+
+def _sql_list(values):
+    return ",".join("'" + v.replace("'", "''") + "'" for v in values)
+
+
+def expire_by_ttl(table):
+    """Delete rows older than their source kind's TTL. Returns rows deleted."""
+    deleted = 0
+    for kind, days in RETENTION_TTL_DAYS.items():
+        if kind in RETENTION_PROTECTED:
+            continue
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        predicate = f"source_kind = '{kind}' AND timestamp < '{cutoff}'"
+        count = table.count_rows(predicate)
+        if count:
+            table.delete(predicate)
+            print(f"   🧹 Expired {count} '{kind}' rows older than {days} days.")
+            deleted += count
+    return deleted
+
+
+def evict_over_budget(table, usage):
+    """
+    Trim the table to MAX_ROWS, least recently used first. A row's last use
+    is its last recall, or when it was learned if it was never recalled.
+    Returns the evicted content hashes.
+    """
+    excess = table.count_rows() - MAX_ROWS if MAX_ROWS else 0
+    if excess <= 0:
+        return []
+
+    protected = f"source_kind NOT IN ({_sql_list(RETENTION_PROTECTED)})" if RETENTION_PROTECTED else None
+    query = table.search()
+    if protected:
+        query = query.where(protected)
+    rows = query.select(["content_hash", "timestamp"]).limit(None).to_arrow()
+    hashes = rows["content_hash"].to_pylist()
+
+    # ISO timestamps sort as strings: no parsing needed
+    recalled = usage.last_recalled()
+    last_used = np.asarray([max(ts or "", recalled.get(h, "")) for h, ts in zip(hashes, rows["timestamp"].to_pylist())])
+
+    excess = min(excess, len(hashes))
+    victims = [hashes[i] for i in np.argpartition(last_used, excess - 1)[:excess]]
+    for i in range(0, len(victims), DELETE_BATCH):
+        table.delete(f"content_hash IN ({_sql_list(victims[i:i+DELETE_BATCH])})")
+    usage.forget(victims)
+    print(f"   🧹 Evicted {len(victims)} least recently recalled rows (budget {MAX_ROWS}).")
+    return victims
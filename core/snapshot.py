@@ -0,0 +1,188 @@
+"""
+JARVIS Brain Snapshots
+Ships a warm brain between machines: the active knowledge table, vectors
+included, is exported to one Arrow or Parquet file and imported elsewhere
+without re-embedding anything. Both directions stream record batches.
+
+Export: python -m core.snapshot export <brain.parquet | brain.arrow>
+Import: python -m core.snapshot import <file> [--replace] [--no-dedup]
+  Default: merge into the active table, skipping rows it already has.
+  --replace: load the snapshot as a new table version (knowledge_vN) and
+             switch every Brain to it, like core.reembed does.
+"""
+import sys
+import json
+import time
+import itertools
+import lancedb
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime
+
+from core.brain import (
+    DB_PATH, load_active_table, save_active_table,
+    ensure_schema, stored_hashes, table_schema, table_storage,
+    _content_hash, _split_source,
+)
+from core.reembed import _next_table_name
+
+BATCH_ROWS = 8192
+# Schema metadata key holding the embedding model and storage format
+META_KEY = b"jarvis"
+
+
+def _is_arrow(path):
+    """.arrow / .feather / .ipc = Arrow IPC file; anything else = Parquet"""
+    return str(path).endswith((".arrow", ".feather", ".ipc"))
+
+def _open(path):
+    """
+    (schema, batch iterator) for a snapshot file.
+    Arrow IPC files are memory-mapped: the batches point straight into the
+    file and are never copied on the Python side.
+    """
+    if _is_arrow(path):
+        reader = pa.ipc.open_file(pa.memory_map(str(path), "r"))
+        return reader.schema, (reader.get_batch(i) for i in range(reader.num_record_batches))
+    parquet = pq.ParquetFile(str(path))
+    return parquet.schema_arrow, parquet.iter_batches(batch_size=BATCH_ROWS)
+
+def _storage(schema, batches):
+    """(dim, dtype, batches) of a snapshot. Plain list vectors (hand-made files) are sized from the first row."""
+    vector_type = schema.field("vector").type
+    dtype = "float16" if vector_type.value_type == pa.float16() else "float32"
+    if isinstance(vector_type, pa.FixedSizeListType):
+        return vector_type.list_size, dtype, batches
+    first = next(batches, None)
+    if first is None or not first.num_rows:
+        raise ValueError("snapshot has no rows to size its vectors from")
+    return len(first["vector"][0]), dtype, itertools.chain([first], batches)
+
+def _conform(batch, schema):
+    """Match the table's schema: backfill derived columns older snapshots lack, cast the rest"""
+    names = batch.schema.names
+    derived = {}
+    if "content_hash" not in names:
+        derived["content_hash"] = [_content_hash(t) for t in batch["text"].to_pylist()]
+    if "source_kind" not in names or "topic" not in names:
+        split = [_split_source(s) for s in batch["source"].to_pylist()]
+        derived["source_kind"] = [k for k, _ in split]
+        derived["topic"] = [t for _, t in split]
+    arrays = [
+        batch[field.name].cast(field.type) if field.name in names else pa.array(derived[field.name], field.type)
+        for field in schema
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def export_snapshot(path, batch_rows=BATCH_ROWS):
+    """Stream the active table into an Arrow or Parquet file. Returns rows written."""
+    db = lancedb.connect(str(DB_PATH))
+    active = load_active_table()
+    if active["table"] not in db.table_names():
+        print("⚠️ No knowledge table yet, nothing to export.")
+        return 0
+    table = db.open_table(active["table"])
+    ensure_schema(table)
+    dim, dtype = table_storage(table)
+    meta = {
+        "table": active["table"],
+        "embed_model": active["embed_model"],
+        "embed_backend": active["embed_backend"],
+        "dim": dim,
+        "dtype": dtype,
+        "exported_at": datetime.now().isoformat(),
+    }
+    schema = table_schema(dim, dtype).with_metadata({META_KEY: json.dumps(meta)})
+
+    print(f"📦 Exporting '{active['table']}' to {path}...")
+    start = time.time()
+    rows = 0
+    reader = table.search().select(schema.names).to_batches(batch_rows)
+    if _is_arrow(path):
+        writer = pa.ipc.new_file(str(path), schema)
+    else:
+        writer = pq.ParquetWriter(str(path), schema, compression="zstd")
+    with writer:
+        for batch in reader:
+            writer.write_batch(_conform(batch, schema))
+            rows += batch.num_rows
+    print(f"✅ Exported {rows} rows in {time.time() - start:.1f}s ({active['embed_backend']}/{active['embed_model']}, {dtype}, {dim}d).")
+    return rows
+
+
+def import_snapshot(path, replace=False, dedup=True):
+    """
+    Load a snapshot. Merges into the active table unless replace=True or
+    there is no table yet. Returns rows added.
+    """
+    schema, batches = _open(path)
+    meta = json.loads((schema.metadata or {}).get(META_KEY, b"{}"))
+    dim, dtype, batches = _storage(schema, iter(batches))
+    db = lancedb.connect(str(DB_PATH))
+    active = load_active_table()
+    model = meta.get("embed_model", active["embed_model"])
+    backend = meta.get("embed_backend", active["embed_backend"])
+    start = time.time()
+
+    if replace or active["table"] not in db.table_names():
+        name = _next_table_name(db, active["table"]) if active["table"] in db.table_names() else active["table"]
+        target = table_schema(dim, dtype)
+        # Fast path: a snapshot already in the table's layout goes to LanceDB batch by batch, untouched
+        if schema.remove_metadata().equals(target):
+            data = batches
+        else:
+            data = (_conform(b, target) for b in batches)
+        print(f"📥 Importing {path} as '{name}'...")
+        table = db.create_table(name, data=data, schema=target)
+        ensure_schema(table)
+        save_active_table(name, model, backend)
+        rows = table.count_rows()
+        print(f"✅ Imported {rows} rows in {time.time() - start:.1f}s. Brain now uses '{name}' ({backend}/{model}).")
+        return rows
+
+    # Merge: vectors must come from the same model to be comparable
+    if (backend, model) != (active["embed_backend"], active["embed_model"]):
+        print(f"❌ Snapshot vectors come from {backend}/{model}, the brain uses "
+              f"{active['embed_backend']}/{active['embed_model']}.")
+        print("   (Import with --replace, or re-embed one side with 'python -m core.reembed')")
+        return 0
+    table = db.open_table(active["table"])
+    ensure_schema(table)
+    if table_storage(table)[0] != dim:
+        print(f"❌ Snapshot vectors have {dim} dimensions, the table has {table_storage(table)[0]}.")
+        return 0
+
+    print(f"📥 Merging {path} into '{active['table']}'...")
+    added = skipped = 0
+    for batch in batches:
+        batch = _conform(batch, table.schema)
+        if dedup:
+            hashes = batch["content_hash"].to_pylist()
+            # Earlier batches are already in the table, so this also catches repeats across batches
+            known = stored_hashes(table, hashes)
+            seen = set()
+            keep = []
+            for h in hashes:
+                keep.append(h not in known and h not in seen)
+                seen.add(h)
+            skipped += batch.num_rows
+            batch = batch.filter(pa.array(keep))
+            skipped -= batch.num_rows
+        if batch.num_rows:
+            table.add(pa.Table.from_batches([batch]))
+            added += batch.num_rows
+    print(f"✅ Merged {added} rows, skipped {skipped} already known ({time.time() - start:.1f}s).")
+    print("   (Running Brains pick them up on their next maintenance pass)")
+    return added
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("export", "import"):
+        print("Usage: python -m core.snapshot export <file.parquet|file.arrow>")
+        print("       python -m core.snapshot import <file> [--replace] [--no-dedup]")
+        sys.exit(1)
+    if sys.argv[1] == "export":
+        export_snapshot(sys.argv[2])
+    else:
+        import_snapshot(sys.argv[2], replace="--replace" in sys.argv, dedup="--no-dedup" not in sys.argv)
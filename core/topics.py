@@ -0,0 +1,135 @@
+"""
+JARVIS Topic Centroids
+One centroid vector per topic and source kind ("verified:Physics" and
+"orchestra:Physics" are kept apart), as a running sum so learning only
+adds to it. Recall uses them to find the query's topics before searching.
+"""
+import threading
+import numpy as np
+
+# Topics with fewer rows than this are not routed to
+MIN_TOPIC_ROWS = 5
+# Bumped when the saved layout changes (older files are rebuilt)
+FORMAT = 2
+
+
+class TopicCentroids:
+    def __init__(self, path, table_name):
+        self.path = path
+        self.table_name = table_name
+        self._lock = threading.Lock()
+        self.topics = []      # "kind:topic" keys, row i of sums/counts
+        self.sums = None      # (topics, dim) float64 running sums of unit vectors
+        self.counts = None    # rows per topic
+        self.ready = False    # False until built from the table (or loaded)
+        self._load()
+
+    def _load(self):
+        try:
+            data = np.load(self.path, allow_pickle=False)
+            if str(data["table"]) != self.table_name or int(data.get("format", 1)) != FORMAT:
+                return
+            self.topics = data["topics"].tolist()
+            self.sums = data["sums"]
+            self.counts = data["counts"]
+            self.ready = True
+        except Exception:
+            pass
+
+    @property
+    def rows(self):
+        """Rows folded into the centroids"""
+        return int(self.counts.sum()) if self.counts is not None else 0
+
+    def clear(self):
+        """Start empty (for a table that was just created)"""
+        with self._lock:
+            self.topics, self.sums, self.counts = [], None, None
+            self.ready = True
+
+    def save(self):
+        with self._lock:
+            if not self.ready or self.sums is None:
+                return
+            tmp = self.path.with_suffix(".tmp.npz")
+            try:
+                np.savez(tmp, table=self.table_name, format=FORMAT, topics=np.asarray(self.topics),
+                         sums=self.sums, counts=self.counts)
+                tmp.replace(self.path)
+            except OSError:
+                # brain_data gone (benchmark scratch dir removed before exit): rebuilt next run
+                pass
+
+    def _add(self, vectors, topics):
+        """Accumulate (caller holds the lock)"""
+        vectors = np.asarray(vectors, dtype=np.float64)
+        if self.sums is None:
+            self.sums = np.zeros((0, vectors.shape[1]))
+            self.counts = np.zeros(0, dtype=np.int64)
+        index = {t: i for i, t in enumerate(self.topics)}
+        new = [t for t in dict.fromkeys(topics) if t not in index]
+        if new:
+            for t in new:
+                index[t] = len(self.topics)
+                self.topics.append(t)
+            self.sums = np.vstack([self.sums, np.zeros((len(new), self.sums.shape[1]))])
+            self.counts = np.concatenate([self.counts, np.zeros(len(new), dtype=np.int64)])
+        rows = np.asarray([index[t] for t in topics])
+        np.add.at(self.sums, rows, vectors)
+        np.add.at(self.counts, rows, 1)
+
+    def add(self, rows):
+        """Fold freshly written rows in (rows without a topic are skipped)"""
+        tagged = [r for r in rows if r.get("topic")]
+        if not tagged:
+            return
+        with self._lock:
+            self._add([r["vector"] for r in tagged], [_key(r["source_kind"], r["topic"]) for r in tagged])
+
+    def rebuild(self, table, batch_rows=8192):
+        """
+        Recompute every centroid from the table (first run, or after rows were
+        deleted). Built on the side, so recall keeps routing during the scan.
+        """
+        fresh = TopicCentroids(None, self.table_name)
+        reader = table.search().where("topic != ''").select(["vector", "source_kind", "topic"]).to_batches(batch_rows)
+        for batch in reader:
+            dim = batch.schema.field("vector").type.list_size
+            vectors = batch["vector"].flatten().to_numpy(zero_copy_only=False).reshape(-1, dim)
+            keys = [_key(k, t) for k, t in zip(batch["source_kind"].to_pylist(), batch["topic"].to_pylist())]
+            fresh._add(vectors, keys)
+        with self._lock:
+            self.topics, self.sums, self.counts = fresh.topics, fresh.sums, fresh.counts
+            self.ready = True
+        self.save()
+        return len(self.topics)
+
+    def route(self, vector, top_n, min_similarity, source_kind=None):
+        """
+        The query's nearest topics as [(topic, cosine)], best first.
+        Empty when even the best topic is below min_similarity.
+        source_kind limits it to one kind's centroids (e.g. only "verified").
+        """
+        with self._lock:
+            if not self.ready or self.sums is None or not len(self.topics):
+                return []
+            usable = self.counts >= MIN_TOPIC_ROWS
+            if source_kind is not None:
+                usable &= np.asarray([k.split(":", 1)[0] == source_kind for k in self.topics])
+            if not usable.any():
+                return []
+            centroids = self.sums[usable]
+            centroids = centroids / (np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12)
+            names = [k.split(":", 1)[1] for k, ok in zip(self.topics, usable) if ok]
+        sims = centroids @ np.asarray(vector, dtype=np.float64)
+        routed = {}
+        for i in np.argsort(-sims):
+            # The same topic under two kinds counts once (at its best cosine)
+            if sims[i] < min_similarity or len(routed) == top_n:
+                break
+            routed.setdefault(names[i], float(sims[i]))
+        return list(routed.items())
+
+
+def _key(source_kind, topic):
+    return f"{source_kind}:{topic}"
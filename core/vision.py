@@ -4,13 +4,23 @@ Allows JARVIS to see the screen using Ollama Vision models.
 """
 import mss
 import base64
-import ollama
 from io import BytesIO
 from PIL import Image
 
+from core.llm_gateway import ask, INTERACTIVE, BACKGROUND
+from core.llm_tasks import route
+
 class Vision:
     def __init__(self):
-        self.model = "llava" # Standard vision model
+        self.model = route("vision")[0] # Standard vision model (LLM_TASKS in config.py)
+
+    def _ask(self, prompt, img_bytes, priority):
+        """One image + prompt through the LLM gateway"""
+        return ask("vision", [{
+            'role': 'user',
+            'content': prompt,
+            'images': [base64.b64encode(img_bytes).decode()]
+        }], priority=priority)
         
     def analyze_image_from_url(self, url, prompt="Describe this educational image in detail."):
         """Download image and analyze it with VLM"""
@@ -22,19 +32,12 @@ class Vision:
             
             img_bytes = res.content
             
-            response = ollama.chat(
-                model=self.model,
-                messages=[{
-                    'role': 'user',
-                    'content': prompt,
-                    'images': [img_bytes]
-                }]
-            )
-            description = response['message']['content']
+            # Only the orchestra studies diagrams: background priority
+            description = self._ask(prompt, img_bytes, BACKGROUND)
             print(f"   👁️ Vision: {description[:100]}...")
             return description
         except Exception as e:
-            print(f"❌ Vision URL Error: {e} (Try: ollama pull llava)")
+            print(f"❌ Vision URL Error: {e} (Try: ollama pull {self.model})")
             return None
         
     def see_screen(self, prompt="Describe what is on the screen."):
@@ -58,15 +61,7 @@ class Vision:
             img_bytes = buffered.getvalue()
             
         try:
-            response = ollama.chat(
-                model=self.model,
-                messages=[{
-                    'role': 'user',
-                    'content': prompt,
-                    'images': [img_bytes]
-                }]
-            )
-            description = response['message']['content']
+            description = self._ask(prompt, img_bytes, INTERACTIVE)
             print(f"👀 Vision Result: {description[:100]}...")
             return description
             
@@ -4,9 +4,9 @@ Voice, Vision, Brain, and Control.
 """
 import sys
 import os
-import re
 import time
 import random
+from concurrent.futures import ThreadPoolExecutor
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -15,12 +15,31 @@ from core.stt_stream import StreamingSTT
 from core.llm_stream import StreamingLLM
 from core.memory import Memory
 from core.actions import ActionEngine
-from core.brain import Brain
+from core.brain_service import connect_brain
 from core.vision import Vision
+from core.action_tags import split_actions
+from config import RECALL_MODE
 
 WAKE_WORDS = ["jarvis", "hi jarvis", "hey jarvis", "yo jarvis"]
 SLEEP_TIMEOUT = 30
 
+def run_action(cmd, param, actions, brain, vision):
+    """Carry out one action tag (runs on the action thread while the reply streams)"""
+    if cmd == "LOOK":
+        # Vision: the description becomes context for the next turn
+        return vision.see_screen()
+    if cmd == "LEARN":
+        print(f"   🧠 Learning about {param}...")
+        search_result = actions.web_search(param)
+        brain.learn(search_result, source="web")
+        return "Knowledge absorbed."
+    # Standard Actions
+    result = actions.execute(f"{cmd}:{param}")
+    if cmd == "SEARCH":
+        # Auto-learn what we search
+        brain.learn(result, source="search")
+    return result
+
 def main():
     print("\n" + "="*50)
     print("  🤖 JARVIS 3.0 - (Voice/Vision/Control)")
@@ -31,8 +50,10 @@ def main():
     llm = StreamingLLM()
     memory = Memory()
     actions = ActionEngine()
-    brain = Brain()
+    brain = connect_brain()
     vision = Vision()
+    # One at a time, in the order the tags appear ([OPEN: notepad] before [TYPE: ...])
+    action_runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="action")
     
     # Load memory
     llm.update_system_prompt(memory.get_context())
@@ -73,7 +94,7 @@ def main():
             print(f"\n📝 You said: {user_text}")
             
             # 1. RECALL KNOWLEDGE
-            recalled_items = brain.recall(user_text)
+            recalled_items = brain.recall(user_text, mode=RECALL_MODE)
             
             final_input = user_text
             context_prefix = ""
@@ -81,11 +102,9 @@ def main():
             if recalled_items:
                 print(f"💡 Brain Recalled: {len(recalled_items)} chunks")
                 
-                # Deduce Topic from sources
-                topics = [r['source'].replace('verified:', '').replace('web:', '') for r in recalled_items if 'verified:' in r['source']]
-                # Pick most common topic
-                if topics:
-                    dominant_topic = max(set(topics), key=topics.count)
+                # Deduce Topic from the nearest verified topic centroid (orchestra topics are unverified)
+                dominant_topic = brain.topic_for(user_text, source_kind="verified")
+                if dominant_topic:
                     print(f"🎓 Switching Persona: Academic Expert in {dominant_topic}")
                     context_prefix += f"[SYSTEM: You are now an ACADEMIC EXPERT in {dominant_topic}. Use the verified facts below to answer accurately. Be professional and deep.]\n"
                 
@@ -98,47 +117,35 @@ def main():
             if context_prefix:
                 final_input = context_prefix + "\nUSER QUERY: " + user_text
             
-            # 2. GENERATE RESPONSE
+            # 2. GENERATE RESPONSE (action tags start running the moment they are complete)
             print("\n🧠 JARVIS: ", end="", flush=True)
-            full_response = ""
-            for chunk in llm.chat_stream(final_input):
-                print(chunk, end="", flush=True)
-                full_response += chunk
+            dispatched = []
+            def dispatch(cmd, param):
+                dispatched.append((cmd, action_runner.submit(run_action, cmd, param, actions, brain, vision)))
+            try:
+                for chunk in split_actions(llm.chat_stream(final_input), dispatch):
+                    print(chunk, end="", flush=True)
+            except KeyboardInterrupt:
+                # Barge-in: leaving the stream closes it, so Ollama stops generating
+                print("\n   ✋ Interrupted.")
+                continue
             print("\n")
             
-            # 3. EXECUTE ACTIONS
-            commands = re.findall(r"\[(OPEN|CLOSE|SEARCH|SYSTEM|TYPE|LOOK|LEARN|DOC):\s*(.*?)\]", full_response, re.IGNORECASE | re.DOTALL)
-            
-            if commands:
+            # 3. ACTION RESULTS
+            if dispatched:
                 print("⚡ Action Detected:")
                 
-                for cmd, param in commands:
-                    cmd = cmd.upper()
-                    
+                for cmd, future in dispatched:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"   ❌ {cmd} failed: {e}")
+                        continue
                     if cmd == "LOOK":
-                        # Vision
-                        desc = vision.see_screen()
-                        visual_context = desc # Save for next turn
+                        visual_context = result # Save for next turn
                         print(f"   ✓ Vision System Active")
-                        # Optional: Trigger follow-up response?
-                        
-                    elif cmd == "LEARN":
-                        # Learning
-                        print(f"   🧠 Learning about {param}...")
-                        search_result = actions.web_search(param)
-                        brain.learn(search_result, source="web")
-                        print("   ✓ Knowledge absorbed.")
-                        
                     else:
-                        # Standard Actions
-                        action_str = f"{cmd}:{param}"
-                        result = actions.execute(action_str)
                         print(f"   ✓ {result}")
-                        
-                        # Use search result for learning too?
-                        if cmd == "SEARCH":
-                            # Auto-learn what we search
-                            brain.learn(result, source="search")
 
         except KeyboardInterrupt:
             print("\n👋 Shutting down.")
@@ -0,0 +1,84 @@
+"""
+JARVIS LLM Task Report
+How each kind of LLM call performs on the model LLM_TASKS gives it:
+latency percentiles against the task's budget, time to first token,
+queue wait and token counts, from the log every call writes to
+brain_data/llm_calls.jsonl.
+
+Run with: python llm_task_report.py [hours]   (default: everything logged)
+A task over budget on the large model is a candidate for the small tier;
+a small-model task with poor answers can move back up.
+"""
+import sys
+import os
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from core.llm_tasks import CALL_LOG, load_calls, task_spec
+
+
+def _p(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+def summarize(calls):
+    """One row per (task, model)"""
+    groups = {}
+    for c in calls:
+        groups.setdefault((c["task"], c["model"]), []).append(c)
+    rows = []
+    for (task, model), group in sorted(groups.items()):
+        seconds = [c["seconds"] for c in group]
+        prompt = [c["prompt_tokens"] for c in group if c.get("prompt_tokens") is not None]
+        output = [c["output_tokens"] for c in group if c.get("output_tokens") is not None]
+        waits = [c["wait"] for c in group if c.get("wait") is not None]
+        first = [c["first_token"] for c in group if c.get("first_token") is not None]
+        preempted = [c["preempted"] for c in group if c.get("preempted")]
+        budget = task_spec(task).get("budget")
+        rows.append({
+            "task": task,
+            "model": model,
+            "calls": len(group),
+            "p50_s": _p(seconds, 50),
+            "p95_s": _p(seconds, 95),
+            "budget_s": budget,
+            "over_budget": sum(1 for s in seconds if budget is not None and s > budget) / len(group),
+            "first_token_p50_s": _p(first, 50),
+            "wait_p50_s": _p(waits, 50),
+            # Calls that lost an attempt to preemption, and the time lost
+            "preempted_calls": len(preempted),
+            "preempted_s": sum(preempted),
+            "prompt_tokens": float(np.mean(prompt)) if prompt else None,
+            "output_tokens": float(np.mean(output)) if output else None,
+            # Whole-call throughput (prompt processing included)
+            "tokens_per_s": sum(output) / sum(seconds) if output and sum(seconds) else None,
+        })
+    return rows
+
+
+def main(hours=None):
+    since = time.time() - hours * 3600 if hours else None
+    calls = load_calls(since=since)
+    if not calls:
+        print(f"⚠️ No LLM calls logged yet ({CALL_LOG}). Run JARVIS or the orchestra first.")
+        return
+
+    def fmt(v, spec):
+        return format(v, spec) if v is not None else "-"
+
+    print(f"📊 {len(calls)} LLM calls" + (f" in the last {hours}h" if hours else "") + "\n")
+    print(f"{'task':<18}{'model':<16}{'calls':>6}{'p50 s':>8}{'p95 s':>8}{'budget':>8}{'over':>7}"
+          f"{'ttft s':>8}{'wait s':>8}{'in tok':>8}{'out tok':>8}{'tok/s':>7}")
+    for r in summarize(calls):
+        print(f"{r['task']:<18}{r['model'][:15]:<16}{r['calls']:>6}{fmt(r['p50_s'], '.2f'):>8}"
+              f"{fmt(r['p95_s'], '.2f'):>8}{fmt(r['budget_s'], 'g'):>8}{r['over_budget']:>7.0%}"
+              f"{fmt(r['first_token_p50_s'], '.2f'):>8}{fmt(r['wait_p50_s'], '.2f'):>8}"
+              f"{fmt(r['prompt_tokens'], '.0f'):>8}{fmt(r['output_tokens'], '.0f'):>8}{fmt(r['tokens_per_s'], '.1f'):>7}")
+        if r["preempted_calls"]:
+            print(f"   ✂️ {r['task']}: {r['preempted_calls']} calls preempted, {r['preempted_s']:.1f}s lost to preemption")
+        if r["over_budget"] > 0.1:
+            print(f"   ⏱️ {r['task']} misses its {r['budget_s']}s budget on {r['over_budget']:.0%} of calls")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -8,26 +8,26 @@ import time
 import random
 import threading
 import queue
-import ollama
 from concurrent.futures import ThreadPoolExecutor
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from autolearn import get_topics, scrape_url, DDGS
-from core.brain import Brain
+from core.brain_service import connect_brain
 from core.vision import Vision
 from core.coordination import get_orchestra_status
+from core.llm_gateway import ask, BACKGROUND
 
 class CuriousAgent:
     def __init__(self, agent_id, brain):
         self.id = agent_id
         self.brain = brain
-        self.model = "mixtral"
         self.vision = Vision()
         
-    def think(self, prompt):
+    def think(self, prompt, task="synthesis"):
+        # The task picks the model (LLM_TASKS in config.py).
+        # Background priority: waits while the user talks to JARVIS, preempted if it starts
         try:
-            res = ollama.chat(model=self.model, messages=[{'role': 'user', 'content': prompt}])
-            return res['message']['content']
+            return ask(task, [{'role': 'user', 'content': prompt}], priority=BACKGROUND)
         except:
             return ""
 
@@ -46,7 +46,7 @@ class CuriousAgent:
         
         Reply with exactly "YES" or "NO".
         """
-        response = self.think(prompt).strip().upper()
+        response = self.think(prompt, task="relevance").strip().upper()
         return "YES" in response
 
     def research_loop(self, topic, max_duration=120):
@@ -58,7 +58,7 @@ class CuriousAgent:
         
         # 1. Hypothesize Questions
         hypo_prompt = f"Generate 3 specific, expert-level search queries to find ACADEMIC RESEARCH or SCHOLARLY ARTICLES to understand '{topic}' deeply. Include terms like 'journal', 'research paper', or 'overview'. Return only the queries, one per line."
-        queries_text = self.think(hypo_prompt)
+        queries_text = self.think(hypo_prompt, task="query_generation")
         queries = [q.strip() for q in queries_text.split('\n') if q.strip()]
         
         for q in queries:
@@ -87,6 +87,7 @@ class CuriousAgent:
                 results = []  # Fallback if search fails
                 continue
                 
+            gems = []
             for r in results:
                 # Check Time again
                 if time.time() - start_time > max_duration: break
@@ -104,17 +105,21 @@ class CuriousAgent:
                     if is_important:
                         # 5. Synthesize & Store
                         # We store the raw credible content + meta
-                        self.brain.learn(content, source=f"orchestra:{topic}")
-                        print(f"      💎 Agent {self.id}: Found GEM! Stored info about {topic}.")
+                        gems.append((content, f"orchestra:{topic}"))
+                        print(f"      💎 Agent {self.id}: Found GEM! Queued info about {topic}.")
                     else:
                         print(f"      🗑️ Agent {self.id}: Discarded trivial info.")
                         
                 time.sleep(1) 
+                
+            # Store all gems from this query in one bulk ingest
+            if gems:
+                self.brain.learn_many(gems)
 
 class Orchestra:
     def __init__(self, max_agents=3):
         self.max_agents = max_agents
-        self.brain = Brain()
+        self.brain = connect_brain()
         self.topics = get_topics()
         self.work_queue = queue.Queue()
         
@@ -146,7 +151,7 @@ class Orchestra:
                 agent.research_loop(topic, max_duration=120)
                 
                 # Recursive Expansion: Add 1 new related topic
-                new_idea = agent.think(f"Based on {topic}, suggest 1 advanced related sub-topic to research next. Return ONLY the topic name.")
+                new_idea = agent.think(f"Based on {topic}, suggest 1 advanced related sub-topic to research next. Return ONLY the topic name.", task="topic_proposal")
                 if new_idea and len(new_idea) < 50:
                     print(f"   🎻 Agent {agent_id}: Proposed new topic '{new_idea.strip()}'")
                     self.work_queue.put(new_idea.strip())
@@ -5,59 +5,99 @@ Run with: uvicorn server:app --reload
 """
 import sys
 import os
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from pydantic import BaseModel
 from typing import Optional
 
 # Add path to find core modules
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from core.brain import Brain
+from core.brain_service import connect_brain
 from core.actions import ActionEngine
-from config import PROMPT_AI, PROMPT_FRIEND
-import ollama
+from core.response_cache import SemanticResponseCache, context_fingerprint
+from core.llm_gateway import ask, INTERACTIVE
+from config import PROMPT_AI, PROMPT_FRIEND, RECALL_MODE, RESPONSE_CACHE
 
 app = FastAPI(title="JARVIS API", version="1.0")
 
 # Initialize Cores
-brain = Brain()
+brain = connect_brain()
 actions = ActionEngine()
 
+response_cache = None
+if RESPONSE_CACHE:
+    # Same text as the recall just before it, so the embedding cache already has it
+    response_cache = SemanticResponseCache(brain.embed_query)
+
+def _cached_answer(question, persona, memories):
+    """(answer or None, ticket) from the response cache; never fails the request"""
+    if response_cache is None:
+        return None, None
+    try:
+        return response_cache.get(question, context_fingerprint(persona, memories))
+    except Exception:
+        return None, None
+
+def _cache_answer(ticket, answer):
+    if ticket is not None:
+        try:
+            response_cache.put(ticket, answer)
+        except Exception:
+            pass
+
 class ChatRequest(BaseModel):
     message: str
     persona: str = "ai"  # "ai" or "friend"
+    recall_mode: str = RECALL_MODE  # "hybrid" or "vector"
+    use_cache: bool = True  # Reuse the answer to an identical / near-identical question
 
 class ChatResponse(BaseModel):
     response: str
     actions_triggered: list = []
+    cached: bool = False  # True when the answer came from the response cache
 
 @app.get("/")
 def health_check():
     return {"status": "online", "system": "JARVIS"}
 
+@app.get("/brain/stats")
+def brain_stats():
+    """Cache effectiveness: recall result cache, embedding cache and API response cache"""
+    stats = brain.stats()
+    if response_cache is not None:
+        stats["response_cache"] = response_cache.stats()
+    return stats
+
 @app.get("/ask")
-def simple_ask(q: str):
+def simple_ask(q: str, response: Response, mode: str = RECALL_MODE, cache: bool = True):
     """
     Simple GET endpoint.
-    Usage: /ask?q=What is the weather?
-    Returns: Just the text answer.
+    Usage: /ask?q=What is the weather?&mode=hybrid
+    Returns: Just the text answer (header X-JARVIS-Cache: HIT when it was reused).
     """
     # Use AI mode by default for simple queries
-    memories = brain.recall(q)
+    memories = brain.recall(q, mode=mode)
+    answer, ticket = _cached_answer(q, "ai", memories) if cache else (None, None)
+    response.headers["X-JARVIS-Cache"] = "HIT" if answer is not None else "MISS"
+    if answer is not None:
+        return answer
     context_str = ""
     if memories:
         context_str = "\n[RECALLED MEMORY]:\n" + "\n".join([f"- {m['text']}" for m in memories])
         
     final_prompt = PROMPT_AI.replace("{memory_context}", context_str)
     
-    res = ollama.chat(
-        model="mixtral", # Reverting to installed model
-        messages=[
+    # Interactive: ahead of the orchestra in the LLM gateway queue
+    answer = ask(
+        "chat",
+        [
             {"role": "system", "content": final_prompt},
             {"role": "user", "content": q}
-        ]
+        ],
+        priority=INTERACTIVE
     )
-    return res['message']['content']
+    _cache_answer(ticket, answer)
+    return answer
 
 @app.post("/chat", response_model=ChatResponse)
 def chat(req: ChatRequest):
@@ -68,7 +108,11 @@ def chat(req: ChatRequest):
     system_prompt = PROMPT_FRIEND if req.persona == "friend" else PROMPT_AI
     
     # 2. Recall Memory
-    memories = brain.recall(req.message)
+    memories = brain.recall(req.message, mode=req.recall_mode)
+    persona = "friend" if req.persona == "friend" else "ai"
+    answer, ticket = _cached_answer(req.message, persona, memories) if req.use_cache else (None, None)
+    if answer is not None:
+        return {"response": answer, "actions_triggered": [], "cached": True}
     context_str = ""
     if memories:
         context_str = "\n[RECALLED MEMORY]:\n" + "\n".join([f"- {m['text']}" for m in memories])
@@ -78,14 +122,14 @@ def chat(req: ChatRequest):
     
     # 4. Generate Response (Non-streaming for API simplicity)
     try:
-        res = ollama.chat(
-            model="mixtral", 
-            messages=[
+        reply = ask(
+            "chat",
+            [
                 {"role": "system", "content": final_prompt},
                 {"role": "user", "content": req.message}
-            ]
+            ],
+            priority=INTERACTIVE
         )
-        reply = res['message']['content']
         
         # 5. Execute embedded commands if any (Basic auto-execution)
         # Note: In a real API, maybe we simply return them, but user asked to "call upon" JARVIS.
@@ -95,7 +139,8 @@ def chat(req: ChatRequest):
         if req.message.lower().startswith("predict "):
             reply = actions.predict_outcome(req.message[8:])
             
-        return {"response": reply, "actions_triggered": []}
+        _cache_answer(ticket, reply)
+        return {"response": reply, "actions_triggered": [], "cached": False}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,94 @@
+"""
+Action tags: [OPEN: ...], [SEARCH: ...], [LOOK] ... must be found however
+the LLM stream happens to split the reply, and plain brackets must stay text.
+Run with: python test_action_tags.py
+"""
+import sys
+import os
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.action_tags import ActionTagParser, split_actions
+
+REPLY = ("Sure, opening it [OPEN: spotify] now. Let me [look] and [SEARCH: weather in\nLondon]. "
+         "Arrays like a[0] and [OPENING] stay, [OPEN] too, [DOC: Notes | a, b]. Unfinished [TYPE: hel")
+TAGS = [("OPEN", "spotify"), ("LOOK", ""), ("SEARCH", "weather in\nLondon"), ("DOC", "Notes | a, b")]
+TEXT = ("Sure, opening it  now. Let me  and . "
+        "Arrays like a[0] and [OPENING] stay, [OPEN] too, . Unfinished [TYPE: hel")
+
+
+def _run(chunks):
+    found = []
+    text = "".join(split_actions(iter(chunks), lambda command, param: found.append((command, param))))
+    return text, found
+
+
+def test_random_chunking():
+    rng = random.Random(0)
+    for _ in range(500):
+        cuts = sorted(rng.sample(range(1, len(REPLY)), rng.randint(0, 40)))
+        chunks = [REPLY[i:j] for i, j in zip([0] + cuts, cuts + [len(REPLY)])]
+        text, found = _run(chunks)
+        assert found == TAGS, (chunks, found)
+        assert text == TEXT, (chunks, text)
+    # One character at a time
+    assert _run(list(REPLY)) == (TEXT, TAGS)
+    print("✅ Tags found under 500 random chunkings.")
+
+
+def test_look_without_colon():
+    parser = ActionTagParser()
+    assert parser.feed("Let me [LO") == ("Let me ", [])
+    assert parser.feed("OK ] at it") == (" at it", [("LOOK", "")])
+    # Only LOOK may come without a parameter
+    assert _run(["[SEARCH] and [OPEN]"]) == ("[SEARCH] and [OPEN]", [])
+    print("✅ [LOOK] without a colon dispatched.")
+
+
+def test_false_positives():
+    for text in ("a[0] + b[1]", "[OPENING] soon", "[OPEN", "[ ]", "[x: y]"):
+        assert _run([text]) == (text, []), text
+    assert _run(["[[LOOK]"]) == ("[", [("LOOK", "")])
+    # A bracket that can't become a tag is released right away, not at the end
+    parser = ActionTagParser()
+    assert parser.feed("a[0") == ("a[0", [])
+    assert parser.feed("[OPENI") == ("[OPENI", [])
+    print("✅ Plain brackets kept as text.")
+
+
+def test_commands_subset():
+    # A front-end that can't open apps must show [OPEN: ...] instead of dropping it
+    commands = ("DOC", "SEARCH", "LEARN")
+    rng = random.Random(1)
+    for _ in range(100):
+        cuts = sorted(rng.sample(range(1, len(REPLY)), rng.randint(0, 40)))
+        chunks = [REPLY[i:j] for i, j in zip([0] + cuts, cuts + [len(REPLY)])]
+        found = []
+        text = "".join(split_actions(iter(chunks), lambda c, p: found.append((c, p)), commands=commands))
+        assert found == [t for t in TAGS if t[0] in commands], found
+        assert text == REPLY.replace("[SEARCH: weather in\nLondon]", "").replace("[DOC: Notes | a, b]", ""), text
+    print("✅ Tags outside the front-end's commands shown as text.")
+
+
+def test_dispatch_before_stream_ends():
+    order = []
+
+    def chunks():
+        for chunk in ["Hi [SEA", "RCH: x]", " long answer", " continues"]:
+            order.append("chunk")
+            yield chunk
+
+    for _ in split_actions(chunks(), lambda command, param: order.append(command)):
+        order.append("text")
+    # SEARCH runs as soon as the chunk closing it arrives
+    assert order == ["chunk", "text", "chunk", "SEARCH", "chunk", "text", "chunk", "text"], order
+    print("✅ Tags dispatched while the reply is still streaming.")
+
+
+if __name__ == "__main__":
+    test_random_chunking()
+    test_look_without_colon()
+    test_false_positives()
+    test_commands_subset()
+    test_dispatch_before_stream_ends()
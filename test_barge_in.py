@@ -0,0 +1,84 @@
+"""
+Barge-in: Ctrl+C in the middle of chat_stream must reach the caller as
+KeyboardInterrupt and close the Ollama stream (fake server, no Ollama needed).
+Run with: python test_barge_in.py
+"""
+import sys
+import os
+import json
+import time
+import _thread
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import core.llm_stream as llm_stream
+from core.llm_stream import StreamingLLM
+
+CHUNKS = 50
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    """Streams CHUNKS words, 50ms apart; counts completed and aborted replies"""
+    protocol_version = "HTTP/1.1"
+    completed = 0
+    aborted = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i in range(CHUNKS):
+                self._send({"message": {"content": f" w{i}"}, "done": False})
+                time.sleep(0.05)
+            self._send({"message": {"content": ""}, "done": True})
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+            FakeOllama.completed += 1
+        except (BrokenPipeError, ConnectionResetError):
+            FakeOllama.aborted += 1
+
+    def _send(self, data):
+        line = json.dumps(data).encode() + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+
+def test_ctrl_c_closes_stream():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    llm_stream.OLLAMA_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    llm = StreamingLLM()
+
+    received = []
+    interrupted = False
+    try:
+        for chunk in llm.chat_stream("hello"):
+            received.append(chunk)
+            if len(received) == 5:
+                # Ctrl+C arrives while the next chunk is awaited
+                threading.Timer(0.02, _thread.interrupt_main).start()
+    except KeyboardInterrupt:
+        interrupted = True
+    finally:
+        deadline = time.time() + 3
+        while not FakeOllama.aborted and time.time() < deadline:
+            time.sleep(0.05)
+        server.shutdown()
+
+    assert interrupted, "KeyboardInterrupt did not reach the caller"
+    assert len(received) < CHUNKS
+    assert FakeOllama.aborted == 1 and FakeOllama.completed == 0, (FakeOllama.aborted, FakeOllama.completed)
+    # The partial turn is kept in history
+    assert llm.conversation_history[-1]["content"].startswith(" w0 w1 w2 w3 w4")
+    print(f"✅ Barge-in after {len(received)} chunks closed the stream.")
+
+
+if __name__ == "__main__":
+    test_ctrl_c_closes_stream()
@@ -0,0 +1,64 @@
+"""
+Chunking: a document must give the same chunks whether it arrives whole or
+in pieces split anywhere, and text without sentence ends must still stream.
+Run with: python test_chunking.py
+"""
+import sys
+import os
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.chunking import SentenceChunker, iter_sentences
+
+README = os.path.join(os.path.dirname(os.path.abspath(__file__)), "README.md")
+
+
+def _random_pieces(rng, text):
+    cuts = sorted(rng.sample(range(1, len(text)), rng.randint(1, 300)))
+    return [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+
+
+def test_split_anywhere():
+    with open(README, encoding="utf-8") as f:
+        doc = f.read()
+    chunker = SentenceChunker()
+    whole = list(chunker(doc))
+    rng = random.Random(0)
+    for _ in range(100):
+        pieces = _random_pieces(rng, doc)
+        assert list(chunker(pieces)) == whole, pieces
+    # One character at a time
+    assert list(chunker(list(doc))) == whole
+    print(f"✅ Same {len(whole)} chunks under 100 random splits.")
+
+
+def test_paragraph_across_pieces():
+    expected = [("First para ends here.", True), ("Second para starts.", True)]
+    assert list(iter_sentences("First para ends here.\n\nSecond para starts.")) == expected
+    assert list(iter_sentences(["First para ends here.\n", "\nSecond para starts."])) == expected
+    assert list(iter_sentences(["First para ends here.", "\n\n", "Second para starts."])) == expected
+    print("✅ Paragraph break split across pieces kept.")
+
+
+def test_no_sentence_ends():
+    text = " ".join(["word"] * 160_000)   # 800 KB, no . ! ? and no blank line
+    pieces = [text[i:i + 4096] for i in range(0, len(text), 4096)]
+    start = time.perf_counter()
+    first = None
+    for sentence, _ in iter_sentences(pieces, max_tokens=128):
+        if first is None:
+            first = time.perf_counter() - start
+        assert len(sentence.split()) <= 128
+    elapsed = time.perf_counter() - start
+    # Streams (first cut after the first piece) and stays linear
+    assert first < 0.05 and elapsed < 2, (first, elapsed)
+    assert list(iter_sentences("a b c d e", max_tokens=2)) == [("a b", False), ("c d", False), ("e", True)]
+    print(f"✅ 800 KB without sentence ends chunked in {elapsed:.2f}s.")
+
+
+if __name__ == "__main__":
+    test_split_anywhere()
+    test_paragraph_across_pieces()
+    test_no_sentence_ends()
@@ -0,0 +1,127 @@
+"""
+LLM task routing: each task reaches Ollama on its model with its options,
+a small model that isn't pulled falls back to OLLAMA_MODEL, and every call
+is logged with its latency and token counts (fake server, no Ollama needed).
+Run with: python test_llm_tasks.py
+"""
+import sys
+import os
+import json
+import tempfile
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import core.llm_gateway as llm_gateway
+import core.llm_tasks as llm_tasks
+from config import OLLAMA_MODEL, LLM_SMALL_MODEL, LLM_TASKS
+from core.llm_tasks import route, load_calls
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    """Streams a two-word reply; models in `missing` get Ollama's 404"""
+    protocol_version = "HTTP/1.1"
+    missing = set()
+    seen = []   # (model, options) per request
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        FakeOllama.seen.append((body["model"], body.get("options")))
+        if body["model"] in FakeOllama.missing:
+            error = json.dumps({"error": f"model '{body['model']}' not found"}).encode()
+            self.send_response(404)
+            self.send_header("Content-Length", str(len(error)))
+            self.end_headers()
+            self.wfile.write(error)
+            return
+        lines = [
+            {"message": {"content": "YES"}, "done": False},
+            {"message": {"content": " sir"}, "done": False},
+            {"message": {"content": ""}, "done": True, "prompt_eval_count": 12, "eval_count": 2},
+        ]
+        payload = b"".join(json.dumps(line).encode() + b"\n" for line in lines)
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def _start():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    llm_gateway.OLLAMA_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    # Schedule in this process (never a running gateway service) and log to a scratch file
+    llm_gateway._gateway = llm_gateway.LLMGateway()
+    llm_tasks.CALL_LOG = Path(tempfile.mkdtemp()) / "llm_calls.jsonl"
+    FakeOllama.missing, FakeOllama.seen = set(), []
+    llm_tasks._missing.clear()
+    return server
+
+
+def test_route():
+    model, options = route("relevance")
+    assert (model, options) == (LLM_SMALL_MODEL, LLM_TASKS["relevance"]["options"])
+    # Callers may add to the options without changing LLM_TASKS
+    options["stop"] = ["\n"]
+    assert "stop" not in LLM_TASKS["relevance"]["options"]
+    assert route("no_such_task") == (OLLAMA_MODEL, {})
+    print("✅ Tasks routed to their model and options.")
+
+
+def test_ask_routes_and_logs():
+    server = _start()
+    try:
+        messages = [{"role": "user", "content": "Is this relevant?"}]
+        assert llm_gateway.ask("relevance", messages) == "YES sir"
+        assert llm_gateway.ask("synthesis", messages) == "YES sir"
+    finally:
+        server.shutdown()
+
+    assert FakeOllama.seen == [
+        (LLM_SMALL_MODEL, LLM_TASKS["relevance"]["options"]),
+        (OLLAMA_MODEL, None),
+    ], FakeOllama.seen
+    calls = load_calls(llm_tasks.CALL_LOG)
+    assert [(c["task"], c["model"]) for c in calls] == [("relevance", LLM_SMALL_MODEL), ("synthesis", OLLAMA_MODEL)]
+    for call in calls:
+        assert call["prompt_tokens"] == 12 and call["output_tokens"] == 2, call
+        assert call["seconds"] >= 0 and call["wait"] >= 0 and call["preempted"] == 0, call
+        assert call["budget"] == LLM_TASKS[call["task"]]["budget"]
+    print("✅ Calls reached Ollama on their model and were logged.")
+
+
+def test_small_model_fallback():
+    server = _start()
+    FakeOllama.missing = {LLM_SMALL_MODEL, "llava"}
+    try:
+        messages = [{"role": "user", "content": "Is this relevant?"}]
+        assert llm_gateway.ask("relevance", messages) == "YES sir"
+        # Remembered: the next small-model task goes straight to OLLAMA_MODEL
+        assert llm_gateway.ask("summary", messages) == "YES sir"
+        # A missing vision model has no text-only stand-in
+        try:
+            llm_gateway.ask("vision", messages)
+            raise AssertionError("404 for the vision model was swallowed")
+        except requests.exceptions.HTTPError as e:
+            assert e.response.status_code == 404
+    finally:
+        server.shutdown()
+        llm_tasks._missing.clear()
+
+    assert [m for m, _ in FakeOllama.seen] == [LLM_SMALL_MODEL, OLLAMA_MODEL, OLLAMA_MODEL, "llava"], FakeOllama.seen
+    calls = load_calls(llm_tasks.CALL_LOG)
+    assert [(c["task"], c["model"]) for c in calls] == [("relevance", OLLAMA_MODEL), ("summary", OLLAMA_MODEL)]
+    print("✅ Missing small model fell back to the main model.")
+
+
+if __name__ == "__main__":
+    test_route()
+    test_ask_routes_and_logs()
+    test_small_model_fallback()
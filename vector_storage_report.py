@@ -0,0 +1,121 @@
+"""
+JARVIS Vector Storage Report
+What do float16 and truncated-dimension vectors cost in recall quality,
+and what do they save in disk and search latency? Measured on a sample of
+your own brain: the stored vectors are the ground truth (exact float32 search).
+
+Run with: python vector_storage_report.py [sample_rows]
+Then pick VECTOR_DTYPE / VECTOR_DIM in config.py.
+"""
+import sys
+import os
+import json
+import time
+import shutil
+import tempfile
+import numpy as np
+import lancedb
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import RERANK_CANDIDATES
+from core.brain import BRAIN_DIR, DB_PATH, load_active_table, table_schema, table_storage, compact_vector
+
+# (dtype, dim) pairs to compare; None = full dimension
+SETTINGS = [
+    ("float32", None), ("float16", None),
+    ("float32", 512), ("float16", 512),
+    ("float16", 256), ("float16", 128), ("float16", 64),
+]
+QUERIES = 200
+TOP_K = 10
+REPORT_PATH = BRAIN_DIR / "storage_report.json"
+
+
+def _dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+def _percentile_ms(samples, p):
+    return round(float(np.percentile(samples, p)) * 1000, 2)
+
+def _measure(table, queries, corpus, truth, dim, rerank):
+    """Recall@TOP_K against exact search, plus per-query latency"""
+    latencies = []
+    recalls = []
+    for qi, q in enumerate(queries):
+        start = time.perf_counter()
+        limit = TOP_K * RERANK_CANDIDATES if rerank else TOP_K
+        hits = table.search(compact_vector(q, dim)).select(["content_hash", "_distance"]).limit(limit).to_list()
+        ids = np.asarray([int(h["content_hash"]) for h in hits])
+        if rerank:
+            # Full-precision re-score, as Brain does with the embedding cache
+            ids = ids[np.argsort(-(corpus[ids] @ q))][:TOP_K]
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len(set(ids.tolist()) & set(truth[qi].tolist())) / TOP_K)
+    return float(np.mean(recalls)), latencies
+
+def main(sample_rows=20000):
+    db = lancedb.connect(str(DB_PATH))
+    active = load_active_table()
+    if active["table"] not in db.table_names():
+        print("⚠️ No knowledge table yet. Let the brain learn something first.")
+        return
+    table = db.open_table(active["table"])
+    full_dim, dtype = table_storage(table)
+    if dtype != "float32":
+        print(f"⚠️ '{active['table']}' is stored as {dtype}/{full_dim}d: ground truth is already approximate.")
+
+    data = table.search().select(["vector"]).limit(sample_rows + QUERIES).to_arrow()
+    vectors = data["vector"].combine_chunks().flatten().to_numpy().astype(np.float32).reshape(-1, full_dim)
+    if len(vectors) < QUERIES * 2:
+        print(f"⚠️ Need at least {QUERIES * 2} rows, found {len(vectors)}.")
+        return
+    # Held-out rows act as queries against the rest
+    queries, corpus = vectors[:QUERIES], vectors[QUERIES:]
+    truth = np.argsort(-(queries @ corpus.T), axis=1)[:, :TOP_K]
+    print(f"📏 {len(corpus)} rows, {QUERIES} queries, {full_dim}d source vectors, recall@{TOP_K}\n")
+
+    report = []
+    tmp = tempfile.mkdtemp()
+    try:
+        scratch = lancedb.connect(tmp)
+        for store_dtype, store_dim in SETTINGS:
+            dim = min(store_dim or full_dim, full_dim)
+            name = f"{store_dtype}_{dim}"
+            if any(r["setting"] == name for r in report):
+                continue
+            rows = [{
+                "vector": compact_vector(v, dim), "text": "", "source": "", "timestamp": "",
+                "content_hash": str(i), "source_kind": "", "topic": "",
+            } for i, v in enumerate(corpus)]
+            t = scratch.create_table(name, rows, schema=table_schema(dim, store_dtype))
+            disk = _dir_bytes(os.path.join(tmp, f"{name}.lance"))
+
+            for rerank in (False, True):
+                if rerank and store_dtype == "float32" and dim == full_dim:
+                    continue  # Nothing to rerank
+                recall, latencies = _measure(t, queries, corpus, truth, dim, rerank)
+                report.append({
+                    "setting": name,
+                    "dtype": store_dtype,
+                    "dim": dim,
+                    "rerank": rerank,
+                    f"recall@{TOP_K}": round(recall, 4),
+                    "disk_mb": round(disk / 1e6, 2),
+                    "p50_ms": _percentile_ms(latencies, 50),
+                    "p99_ms": _percentile_ms(latencies, 99),
+                })
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"{'setting':<14}{'rerank':<8}{'recall':>8}{'disk MB':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for r in report:
+        print(f"{r['setting']:<14}{'yes' if r['rerank'] else 'no':<8}{r[f'recall@{TOP_K}']:>8.3f}"
+              f"{r['disk_mb']:>10.2f}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}")
+
+    with open(REPORT_PATH, 'w') as f:
+        json.dump({"rows": len(corpus), "queries": QUERIES, "source_dim": full_dim, "results": report}, f, indent=2)
+    print(f"\n💾 Saved to {REPORT_PATH}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)